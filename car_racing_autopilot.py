@@ -0,0 +1,248 @@
+from time import perf_counter
+
+import pygame
+
+import car_racing_game as racing
+
+# Candidate inputs: throttle or coast with each steering direction, or brake
+ACTIONS = [
+    racing.KeyState({pygame.K_UP}),
+    racing.KeyState({pygame.K_UP, pygame.K_LEFT}),
+    racing.KeyState({pygame.K_UP, pygame.K_RIGHT}),
+    racing.KeyState(),
+    racing.KeyState({pygame.K_LEFT}),
+    racing.KeyState({pygame.K_RIGHT}),
+    racing.KeyState({pygame.K_DOWN}),
+]
+START = racing.KeyState({pygame.K_RETURN})
+
+# Search shape: each step holds one action for HOLD ticks
+HOLD = 8
+DEPTH = 5
+BEAM_WIDTH = 6
+BUDGET_MS = 3.0
+
+# Plan scoring, in pixels of travel
+CRASH_PENALTY = 100000
+POWER_UP_BONUS = 300
+STEERING_PENALTY = 200  # Per radian of heading left at the end of a plan
+THREAT_RANGE = 250  # Enemies this close ahead in the final lane count against a plan
+THREAT_PENALTY = 400
+COLLISION_MARGIN = 4
+
+# Ticks spent on the game over screen before an attract-mode restart
+RESTART_DELAY = racing.FPS * 2
+
+class Node:
+    __slots__ = ("parent", "actions", "on_plan", "x", "speed", "direction", "steering", "max_speed",
+                 "tick", "travel", "collected", "crashed", "score", "value")
+
+class Autopilot:
+    """Beam search driver for the player car.
+
+    Every call plans HOLD * DEPTH ticks ahead: each plan step holds one of
+    ACTIONS, simulated on a scratch PlayerCar with its own update(), while
+    enemies, obstacles and power-ups move at their known speeds relative
+    to the player's travel. Plans are scored on distance covered, crashes,
+    power-ups collected and traffic left ahead at the end. The best
+    BEAM_WIDTH plans at each depth are extended.
+
+    Search stops when budget_ms has passed (or max_nodes have been
+    expanded, for reproducible runs), returning the best plan found so
+    far. The remainder of the previous frame's plan is always expanded
+    first, so a cut-short search never does worse than continuing it.
+    nodes and elapsed_ms describe the latest call.
+    """
+
+    def __init__(self, budget_ms=BUDGET_MS, max_nodes=None):
+        self.budget = None if budget_ms is None else budget_ms / 1000
+        self.max_nodes = max_nodes
+        self.plan = []
+        self.plan_time = None
+        self.game = None
+        self.scratch = None
+        self.waited = 0
+
+        self.nodes = 0
+        self.elapsed_ms = 0.0
+        self.frames = 0
+        self.total_nodes = 0
+        self.max_elapsed_ms = 0.0
+
+    def __call__(self, game):
+        """Key state for the next tick; starts races from the menu and game over screens."""
+        if game.state != racing.PLAYING:
+            self.plan = []
+            self.waited += 1
+            if game.state == racing.MENU or self.waited >= RESTART_DELAY:
+                self.waited = 0
+                return START
+            return ACTIONS[3]
+
+        start = perf_counter()
+        self.search(game, start)
+        self.elapsed_ms = (perf_counter() - start) * 1000
+        self.frames += 1
+        self.total_nodes += self.nodes
+        self.max_elapsed_ms = max(self.max_elapsed_ms, self.elapsed_ms)
+        return ACTIONS[self.plan[0]]
+
+    def out_of_budget(self, deadline):
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            return True
+        return deadline is not None and perf_counter() >= deadline
+
+    def search(self, game, start):
+        deadline = None if self.budget is None else start + self.budget
+        if self.scratch is None or self.scratch.road is not game.road:
+            self.scratch = racing.PlayerCar(game.road)
+        self.targets(game)
+
+        # Drop the part of the previous plan that has been played since, or
+        # all of it if this is a different race from the last call
+        if game is not self.game or self.plan_time is None or game.game_time < self.plan_time:
+            self.plan = []
+        else:
+            played = round((game.game_time - self.plan_time) * racing.FPS / game.step_scale)
+            self.plan = self.plan[played:]
+        self.game = game
+        self.plan_time = game.game_time
+        previous = self.plan + [self.plan[-1] if self.plan else 0] * (HOLD * DEPTH - len(self.plan))
+
+        player = game.player
+        root = Node()
+        root.parent = None
+        root.actions = ()
+        root.on_plan = True
+        root.x, root.speed, root.direction = player.x, player.speed, player.direction
+        root.steering, root.max_speed = player.steering, player.max_speed
+        root.tick = root.travel = root.score = root.value = 0
+        root.collected = frozenset()
+        root.crashed = False
+
+        self.nodes = 0
+        beam = [root]
+        best = root
+        for depth in range(DEPTH):
+            children = []
+            stopped = False
+            for node in beam:
+                if node.crashed:
+                    continue
+                # The previous plan's continuation goes first, then each action held
+                continuation = tuple(previous[node.tick:node.tick + HOLD])
+                options = [(continuation, True)] if node.on_plan else []
+                options.extend(((action,) * HOLD, False) for action in range(len(ACTIONS))
+                               if (action,) * HOLD != continuation or not node.on_plan)
+                for actions, on_plan in options:
+                    if self.out_of_budget(deadline):
+                        stopped = True
+                        break
+                    children.append(self.expand(node, actions, on_plan, game))
+                if stopped:
+                    break
+            if not children:
+                break
+
+            # Keep the best children, and the previous plan's line at the front
+            children.sort(key=lambda child: child.value, reverse=True)
+            beam = children[:BEAM_WIDTH]
+            planned = [child for child in children if child.on_plan]
+            if planned:
+                if planned[0] in beam:
+                    beam.remove(planned[0])
+                beam.insert(0, planned[0])
+            leader = children[0]
+            if not stopped or leader.value > best.value:
+                best = leader
+            if stopped:
+                break
+
+        # Unroll the chosen branch into per-tick actions
+        steps = []
+        node = best
+        while node.parent is not None:
+            steps.append(node.actions)
+            node = node.parent
+        self.plan = [action for actions in reversed(steps) for action in actions] or [0]
+
+    def targets(self, game):
+        # (x, y, speed, reach x, reach y, kind, entity) of everything the car can meet
+        player = game.player
+        self.entities = []
+        invincible_ticks = game.invincible_timer / game.step_scale if game.invincible else 0
+        for group, kind in ((game.enemy_cars, "crash"), (game.obstacles, "crash"), (game.power_ups, "bonus")):
+            for entity in group:
+                self.entities.append((entity.x, entity.y, entity.speed,
+                                      (entity.width + player.width) / 2 + COLLISION_MARGIN,
+                                      (entity.height + player.height) / 2 + COLLISION_MARGIN, kind, entity))
+        self.invincible_ticks = invincible_ticks
+        self.player_y = player.y
+
+    def expand(self, parent, actions, on_plan, game):
+        """Simulate actions from parent's state, one per tick, and return the scored child."""
+        self.nodes += 1
+        car = self.scratch
+        car.x, car.speed, car.direction = parent.x, parent.speed, parent.direction
+        car.steering, car.max_speed = parent.steering, parent.max_speed
+        scale = game.step_scale
+        player_y = self.player_y
+        tick = parent.tick
+        travel = parent.travel
+        collected = parent.collected
+        score = parent.score
+        crashed = False
+
+        for action in actions:
+            car.update(ACTIONS[action], scale)
+            tick += 1
+            travel += car.speed * scale
+            for x, y, speed, half_width, half_height, kind, entity in self.entities:
+                # Entities move at their own speed minus the player's
+                ey = y + speed * tick * scale - travel
+                if abs(ey - player_y) < half_height and abs(x - car.x) < half_width:
+                    if kind == "bonus":
+                        if entity not in collected:
+                            collected = collected | {entity}
+                            score += POWER_UP_BONUS
+                    elif tick > self.invincible_ticks:
+                        crashed = True
+                        break
+            if crashed:
+                # Crashing later is better than crashing sooner
+                score -= CRASH_PENALTY - tick * 100
+                break
+
+        child = Node()
+        child.parent = parent
+        child.actions = actions
+        child.on_plan = on_plan and parent.on_plan
+        child.x, child.speed, child.direction = car.x, car.speed, car.direction
+        child.steering, child.max_speed = car.steering, car.max_speed
+        child.tick = tick
+        child.travel = travel
+        child.collected = collected
+        child.crashed = crashed
+        child.score = score + travel - parent.travel
+        child.value = child.score if crashed else child.score - self.outlook(child, game)
+        return child
+
+    def outlook(self, node, game):
+        # Penalty for the heading and the traffic ahead in the car's lane where a plan ends
+        road = game.road
+        lane = road.lane_at(node.x)
+        penalty = abs(node.direction) * STEERING_PENALTY
+        for x, y, speed, half_width, half_height, kind, entity in self.entities:
+            if kind != "crash" or road.lane_at(x) != lane:
+                continue
+            gap = self.player_y - (y + speed * node.tick * game.step_scale - node.travel)
+            if 0 < gap < THREAT_RANGE:
+                penalty += THREAT_PENALTY * (THREAT_RANGE - gap) / THREAT_RANGE
+        return penalty
+
+# Reproducible baseline for tournaments: a node budget instead of a time budget
+_baseline = Autopilot(budget_ms=None, max_nodes=150)
+
+def baseline(game):
+    """Autopilot limited to 150 nodes per frame, usable as car_racing_autopilot:baseline."""
+    return _baseline(game)
@@ -0,0 +1,230 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+import car_racing_game as racing
+from car_racing_tournament import cruise_and_dodge
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+SEED = 2024
+DENSE_TRAFFIC = 500
+PARTICLE_STORM = 20000
+
+# Frames replayed under tracemalloc per scenario (it slows the game down a lot)
+MEMORY_FRAMES = 120
+
+# Metrics compared against a baseline; higher is worse for all of them
+COMPARED = [("update_ms", "mean"), ("update_ms", "p95"), ("draw_ms", "mean"), ("draw_ms", "p95")]
+
+def hold_up(game):
+    return racing.KeyState({pygame.K_UP})
+
+def no_keys(game):
+    return racing.KeyState()
+
+def start_race(game, rng):
+    game.reset()
+    game.state = racing.PLAYING
+
+def no_spawns(game, rng):
+    game.spawn_timer = game.powerup_spawn_timer = game.obstacle_spawn_timer = 0
+
+def fill_traffic(game, rng):
+    # Keep DENSE_TRAFFIC cars on and just above the screen. The player stays
+    # vulnerable so collision queries run each tick; cars touching it are
+    # taken away between ticks, and a race ended by one carries on
+    if game.state == racing.GAME_OVER and game.crash_cause == "car":
+        game.state = racing.PLAYING
+        game.crash_cause = None
+    game.player_hitbox = game.player.collision_mask()
+    for car in list(game.nearby(game.enemy_index, racing.EnemyCar)):
+        if game.player_collides(car):
+            game.remove_entity(game.enemy_cars, game.enemy_pool, game.enemy_index, car)
+    while len(game.enemy_cars) < DENSE_TRAFFIC:
+        car = game.enemy_pool.acquire(rng, rng.randrange(game.road.lanes), game.road)
+        car.y = car.prev_y = rng.uniform(-100, racing.SCREEN_HEIGHT + 50)
+        game.enemy_cars.append(car)
+        game.enemy_index.add(car)
+
+def fill_particles(game, rng):
+    particles = game.particles
+    while len(particles) < PARTICLE_STORM:
+        particles.emit(rng.uniform(0, racing.SCREEN_WIDTH), rng.uniform(0, racing.SCREEN_HEIGHT),
+                       rng.choice(racing.CAR_COLORS), min(500, PARTICLE_STORM - len(particles)))
+
+def restart_after_crash(game, rng):
+    if game.state == racing.GAME_OVER:
+        start_race(game, rng)
+
+def menu_setup(game, rng):
+    game.state = racing.MENU
+
+def nothing(game, rng):
+    pass
+
+# name: (frames, setup, per-frame preparation, input policy, description)
+SCENARIOS = {
+    "empty_road": (3000, start_race, no_spawns, hold_up, "full throttle with spawning disabled"),
+    "dense_traffic": (600, start_race, fill_traffic, no_keys, f"{DENSE_TRAFFIC} enemy cars kept on screen"),
+    "particle_storm": (600, start_race, fill_particles, hold_up, f"{PARTICLE_STORM} live particles"),
+    "long_run": (racing.FPS * 60 * 30, start_race, restart_after_crash, cruise_and_dodge,
+                 "30 minutes of cruise_and_dodge driving, restarting after crashes"),
+    "menu_idle": (1200, menu_setup, nothing, no_keys, "title screen with no input"),
+}
+
+# Game arguments for scenarios that need more than the defaults
+GAME_OPTIONS = {
+    "dense_traffic": {"max_enemies": DENSE_TRAFFIC},
+}
+
+def timing_stats(times):
+    times = np.asarray(times) * 1000
+    return {
+        "mean": float(times.mean()),
+        "p50": float(np.percentile(times, 50)),
+        "p95": float(np.percentile(times, 95)),
+        "p99": float(np.percentile(times, 99)),
+        "max": float(times.max()),
+    }
+
+def run_frames(name, screen, frames, times=None):
+    # Build the scenario's game and step it; returns the game
+    _, setup, prepare, policy, _ = SCENARIOS[name]
+    rng = random.Random(SEED)
+    game = racing.Game(seed=SEED, **GAME_OPTIONS.get(name, {}))
+    setup(game, rng)
+    for i in range(frames):
+        prepare(game, rng)
+        keys = policy(game)
+        start = perf_counter()
+        game.update(keys)
+        updated = perf_counter()
+        game.draw(screen)
+        if times is not None:
+            times[0][i] = updated - start
+            times[1][i] = perf_counter() - updated
+    return game
+
+def run_scenario(name, screen, frames=None):
+    """Run one scenario and return its timing and memory figures."""
+    if frames is None:
+        frames = SCENARIOS[name][0]
+
+    # Timed pass
+    times = (np.empty(frames), np.empty(frames))
+    gc_before = [stats["collections"] for stats in gc.get_stats()]
+    blocks_before = sys.getallocatedblocks()
+    run_frames(name, screen, frames, times)
+    blocks_after = sys.getallocatedblocks()
+    gc_after = [stats["collections"] for stats in gc.get_stats()]
+
+    # Shorter pass under tracemalloc for Python-level allocation figures
+    memory_frames = min(frames, MEMORY_FRAMES)
+    tracemalloc.start()
+    run_frames(name, screen, memory_frames)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "frames": frames,
+        "update_ms": timing_stats(times[0]),
+        "draw_ms": timing_stats(times[1]),
+        "gc_collections": [after - before for before, after in zip(gc_before, gc_after)],
+        "allocated_block_growth": blocks_after - blocks_before,
+        "traced_frames": memory_frames,
+        "traced_peak_kb": peak / 1024,
+        "traced_retained_kb": current / 1024,
+    }
+
+def compare(results, baseline, tolerance):
+    """Print the compared metrics against a baseline; return the regressions found."""
+    regressions = []
+    print(f"{'scenario':<16}{'metric':<16}{'baseline':>10}{'now':>10}{'change':>9}")
+    for name, result in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        for group, stat in COMPARED:
+            old = base[group][stat]
+            new = result[group][stat]
+            change = new / old - 1 if old else 0.0
+            flag = "  REGRESSION" if change > tolerance else ""
+            if flag:
+                regressions.append((name, f"{group}.{stat}", change))
+            print(f"{name:<16}{group + '.' + stat:<16}{old:>10.3f}{new:>10.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark car_racing_game scenarios under the dummy video driver")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--frames", type=int, help="override every scenario's frame count, e.g. for a quick check")
+    parser.add_argument("--out", metavar="PATH", help="write the results to PATH as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against results saved earlier with --out")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="slowdown beyond which a compared metric counts as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    screen = pygame.display.set_mode((racing.SCREEN_WIDTH, racing.SCREEN_HEIGHT))
+    racing.get_sprite_atlas()
+    racing.get_player_rotations()
+
+    results = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "video_driver": pygame.display.get_driver(),
+            "seed": SEED,
+        },
+        "scenarios": {},
+    }
+    for name in args.scenarios or SCENARIOS:
+        result = run_scenario(name, screen, args.frames)
+        results["scenarios"][name] = result
+        update, draw = result["update_ms"], result["draw_ms"]
+        print(f"{name:<16}{result['frames']:>7} frames  update {update['mean']:.3f} ms (p95 {update['p95']:.3f})  "
+              f"draw {draw['mean']:.3f} ms (p95 {draw['p95']:.3f})  gc {result['gc_collections']}  "
+              f"peak {result['traced_peak_kb']:.0f} KB")
+
+    # The OS only reports the process's peak so far, so this covers every scenario run
+    if resource is not None:
+        results["meta"]["process_max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline, args.tolerance):
+            status = 1
+
+    pygame.quit()
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
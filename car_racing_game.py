@@ -1,11 +1,18 @@
+import time
+IMPORT_STARTED = time.perf_counter()  # For the --startup-report timings
+
 import pygame
 import random
 import math
+import os
 import sys
+import argparse
+from collections import OrderedDict
 
-# Initialize pygame
-pygame.init()
-pygame.mixer.init()
+from car_racing_particles import ParticleSystem
+from car_racing_lanes import LaneIndex
+from car_racing_pool import EntityPool
+from car_racing_profiler import FrameProfiler
 
 # Constants
 SCREEN_WIDTH = 800
@@ -25,15 +32,233 @@ DARK_GRAY = (50, 50, 50)
 # Road constants
 ROAD_WIDTH = 500
 ROAD_MARK_WIDTH = 10
-LANE_WIDTH = ROAD_WIDTH // 3
+LANE_COUNT = 3
+LANE_WIDTH = ROAD_WIDTH // LANE_COUNT
+
+# Grass kept in view beyond the road edges when the camera scrolls
+ROAD_MARGIN = 100
+
+class Road:
+    """Lane layout of a straight road, in world x coordinates.
+
+    The road is centred on x = SCREEN_WIDTH // 2 and is ROAD_WIDTH wide,
+    or wider when that leaves lanes narrower than LANE_WIDTH. A road wider
+    than the screen is followed by a horizontal camera; camera_x() gives
+    the world x shown at the left edge of the screen.
+    """
+
+    def __init__(self, lanes=LANE_COUNT):
+        self.lanes = lanes
+        self.width = max(ROAD_WIDTH, lanes * LANE_WIDTH)
+        self.lane_width = self.width // lanes
+        self.left = SCREEN_WIDTH // 2 - self.width // 2
+        self.right = SCREEN_WIDTH // 2 + self.width // 2
+        self.scrolls = self.left - 5 < 0 or self.right + 5 > SCREEN_WIDTH
+
+        # Lane dividers, and the centre line
+        self.dividers = [self.left + self.lane_width * lane for lane in range(1, lanes)]
+        self.center = SCREEN_WIDTH // 2
+
+    def lane_center(self, lane):
+        return self.left + self.lane_width * lane + self.lane_width // 2
+
+    def lane_at(self, x):
+        return min(max(int((x - self.left) // self.lane_width), 0), self.lanes - 1)
+
+    def camera_x(self, x):
+        # Keep world x centred on screen, without showing more than ROAD_MARGIN of grass
+        if not self.scrolls:
+            return 0
+        return min(max(x - SCREEN_WIDTH // 2, self.left - ROAD_MARGIN), self.right + ROAD_MARGIN - SCREEN_WIDTH)
+
+    def visible_lanes(self, camera_x, margin=0):
+        # First and last lane with any part within margin of the screen
+        return self.lane_at(camera_x - margin), self.lane_at(camera_x + SCREEN_WIDTH + margin)
+
+DEFAULT_ROAD = Road()
+
+def interpolate(previous, current, alpha):
+    # Written relative to current so alpha == 1 gives current exactly
+    return current - (current - previous) * (1 - alpha)
+
+def interpolate_wrapped(previous, current, period, alpha):
+    # Like interpolate, for scroll offsets that wrap around at period
+    delta = (current - previous + period / 2) % period - period / 2
+    return (current - delta * (1 - alpha)) % period
+
+# Upper bound on live entities of each type
+MAX_ENEMY_CARS = 64
+MAX_POWER_UPS = 8
+MAX_OBSTACLES = 16
+
+# Entities that fall this far above the screen are returned to their pools
+DESPAWN_ABOVE = -SCREEN_HEIGHT
+
+# Simulation ticks per frame the main loop may run to catch up before it
+# lets the game slow down instead
+MAX_SIM_STEPS = 8
+
+# Seeds are drawn from, and must lie in, range(SEED_LIMIT)
+SEED_LIMIT = 2**63
 
 # Game states
 MENU = 0
 PLAYING = 1
 GAME_OVER = 2
 
-class PlayerCar:
+# Sprite variants
+CAR_COLORS = [(0, 0, 200), (0, 200, 0), (200, 200, 0), (200, 0, 200), (0, 200, 200)]
+POWERUP_TYPES = ["speed", "invincible"]
+ROCK_VARIANTS = 6
+
+# Player car rotation is quantised to this many degrees per cached frame
+ROTATION_STEP = 2
+
+def draw_car_sprite(surface, color, inner_color):
+    width, height = surface.get_size()
+    pygame.draw.rect(surface, color, (0, 0, width, height), border_radius=10)
+    pygame.draw.rect(surface, inner_color, (5, 5, width-10, height-10), border_radius=8)
+    pygame.draw.rect(surface, (150, 150, 150), (10, 15, width-20, 20))  # Windshield
+    pygame.draw.rect(surface, (150, 150, 150), (10, height-35, width-20, 20))  # Rear window
+
+def draw_powerup_sprite(surface, powerup_type):
+    width, height = surface.get_size()
+    if powerup_type == "speed":
+        pygame.draw.circle(surface, (255, 215, 0), (width//2, height//2), width//2)
+        pygame.draw.polygon(surface, BLACK, [(10, 15), (20, 5), (20, 15), (30, 5), (20, 25), (20, 15), (10, 25)])
+    else:  # invincible
+        pygame.draw.circle(surface, (0, 255, 255), (width//2, height//2), width//2)
+        pygame.draw.polygon(surface, BLACK, [(15, 5), (25, 5), (25, 25), (15, 25)])
+
+def rock_points(variant, width=80, height=80):
+    # Each variant always produces the same outline so it can be pre-rendered
+    rng = random.Random(variant)
+    points = []
+    center_x, center_y = width // 2, height // 2
+    for i in range(8):
+        angle = 2 * math.pi * i / 8
+        distance = rng.randint(25, 35)
+        x = center_x + math.cos(angle) * distance
+        y = center_y + math.sin(angle) * distance
+        points.append((x, y))
+    return points
+
+def draw_obstacle_sprite(surface, obstacle_type, variant=0):
+    width, height = surface.get_size()
+    if obstacle_type == "oil":
+        # Draw oil spill
+        pygame.draw.ellipse(surface, (30, 30, 30), (0, 20, width, height - 20))
+        pygame.draw.ellipse(surface, (10, 10, 10), (10, 30, width - 20, height - 40))
+        # Add some shine
+        pygame.draw.ellipse(surface, (50, 50, 70), (15, 35, 20, 10))
+    else:  # rock
+        points = rock_points(variant, width, height)
+        pygame.draw.polygon(surface, (100, 100, 100), points)
+        pygame.draw.polygon(surface, (80, 80, 80), points, 3)
+
+class SpriteAtlas:
+    """Every enemy, power-up and obstacle sprite packed into one surface.
+
+    Sprites are drawn once into a single SRCALPHA sheet, which is converted
+    for fast blitting when a display mode is set. Lookups by key return a
+    subsurface of the sheet:
+
+        ("car", color), ("powerup", type), ("oil",), ("rock", variant)
+    """
+
     def __init__(self):
+        sprites = []
+        for color in CAR_COLORS:
+            inner_color = (color[0]*0.8, color[1]*0.8, color[2]*0.8)
+            sprites.append((("car", color), (50, 80),
+                            lambda surface, c=color, i=inner_color: draw_car_sprite(surface, c, i)))
+        for powerup_type in POWERUP_TYPES:
+            sprites.append((("powerup", powerup_type), (30, 30),
+                            lambda surface, t=powerup_type: draw_powerup_sprite(surface, t)))
+        sprites.append((("oil",), (80, 80), lambda surface: draw_obstacle_sprite(surface, "oil")))
+        for variant in range(ROCK_VARIANTS):
+            sprites.append((("rock", variant), (80, 80),
+                            lambda surface, v=variant: draw_obstacle_sprite(surface, "rock", v)))
+
+        # Lay the sprites out left to right in a single strip
+        self.rects = {}
+        x = 0
+        for key, (width, height), _ in sprites:
+            self.rects[key] = pygame.Rect(x, 0, width, height)
+            x += width
+        sheet_height = max(rect.height for rect in self.rects.values())
+        self.sheet = pygame.Surface((x, sheet_height), pygame.SRCALPHA)
+        for key, _, draw in sprites:
+            draw(self.sheet.subsurface(self.rects[key]))
+
+        # Collision masks come from the unconverted sheet so they also work headless
+        self.masks = {key: pygame.mask.from_surface(self.sheet.subsurface(rect))
+                      for key, rect in self.rects.items()}
+
+        if pygame.display.get_surface() is not None:
+            self.sheet = self.sheet.convert_alpha()
+        self.sprites = {key: self.sheet.subsurface(rect) for key, rect in self.rects.items()}
+
+    def __getitem__(self, key):
+        return self.sprites[key]
+
+class RotationCache:
+    """Rotated copies of a sprite and their collision masks.
+
+    One entry is kept per ROTATION_STEP degrees, so drawing a rotated sprite
+    is a table lookup and collisions can use the exact rotated outline.
+    """
+
+    def __init__(self, image, step=ROTATION_STEP):
+        self.step = step
+        self.count = int(360 // step)
+        self.images = []
+        self.masks = []
+        converted = pygame.display.get_surface() is not None
+        for i in range(self.count):
+            rotated = pygame.transform.rotate(image, i * step)
+            self.masks.append(pygame.mask.from_surface(rotated))
+            self.images.append(rotated.convert_alpha() if converted else rotated)
+
+    def index(self, angle):
+        return int(round(angle / self.step)) % self.count
+
+_sprite_atlas = None
+_player_rotations = None
+
+def get_sprite_atlas():
+    """Return the shared sprite atlas, building it on first use."""
+    global _sprite_atlas
+    if _sprite_atlas is None:
+        _sprite_atlas = SpriteAtlas()
+    return _sprite_atlas
+
+def get_player_rotations():
+    """Return the shared rotation cache for the player car, building it on first use."""
+    global _player_rotations
+    if _player_rotations is None:
+        _player_rotations = RotationCache(PlayerCar().build_image())
+    return _player_rotations
+
+_fonts = {}
+
+def get_font(size):
+    """Return pygame's bundled default font at size, initialising pygame.font on first use.
+
+    Loading the bundled file directly skips the system font scan SysFont does.
+    Fonts from before a pygame.quit() are dropped, since they no longer render.
+    """
+    if not pygame.font.get_init():
+        _fonts.clear()
+        pygame.font.init()
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+class PlayerCar:
+    def __init__(self, road=DEFAULT_ROAD):
+        self.road = road
         self.width = 50
         self.height = 80
         self.x = SCREEN_WIDTH // 2
@@ -46,25 +271,35 @@ class PlayerCar:
         self.direction = 0
         self.steering_speed = 0.03
 
+        # State before the latest tick, for drawing between ticks
+        self.prev_x = self.x
+        self.prev_direction = self.direction
+
+        # Rotated sprites and masks are shared by every PlayerCar and built on first use
+        self.rotations = None
+
+    def build_image(self):
         # Create a car shape instead of just a rectangle
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        pygame.draw.rect(self.image, RED, (0, 0, self.width, self.height), border_radius=10)
-        pygame.draw.rect(self.image, (200, 0, 0), (5, 5, self.width-10, self.height-10), border_radius=8)
-        pygame.draw.rect(self.image, (150, 150, 150), (10, 15, self.width-20, 20))  # Windshield
-        pygame.draw.rect(self.image, (150, 150, 150), (10, self.height-35, self.width-20, 20))  # Rear window
+        image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        draw_car_sprite(image, RED, (200, 0, 0))
+        return image
+
+    def update(self, keys, scale=1.0):
+        # scale is the tick length in 1/FPS units; every per-tick change is multiplied by it
+        self.prev_x = self.x
+        self.prev_direction = self.direction
 
-    def update(self, keys):
         # Handle acceleration
         if keys[pygame.K_UP]:
-            self.speed = min(self.speed + self.acceleration, self.max_speed)
+            self.speed = min(self.speed + self.acceleration * scale, self.max_speed)
         elif keys[pygame.K_DOWN]:
-            self.speed = max(self.speed - self.deceleration, -self.max_speed/2)
+            self.speed = max(self.speed - self.deceleration * scale, -self.max_speed/2)
         else:
             # Apply friction when no key is pressed
             if self.speed > 0:
-                self.speed = max(self.speed - 0.1, 0)
+                self.speed = max(self.speed - 0.1 * scale, 0)
             elif self.speed < 0:
-                self.speed = min(self.speed + 0.1, 0)
+                self.speed = min(self.speed + 0.1 * scale, 0)
 
         # Handle steering
         if keys[pygame.K_LEFT]:
@@ -76,148 +311,455 @@ class PlayerCar:
 
         # Apply steering (more effect at higher speeds)
         steering_factor = abs(self.speed) / self.max_speed
-        self.direction += self.steering * steering_factor
+        self.direction += self.steering * steering_factor * scale
 
         # Update position based on speed and direction
-        self.x += math.sin(self.direction) * self.speed
+        self.x += math.sin(self.direction) * self.speed * scale
+
+        # Keep player on the road
+        self.x = max(self.road.left + self.width // 2, min(self.x, self.road.right - self.width // 2))
+
+    def rotation_index(self, direction=None):
+        if self.rotations is None:
+            self.rotations = get_player_rotations()
+        if direction is None:
+            direction = self.direction
+        return self.rotations.index(-direction * 180 / math.pi * 0.5)  # Scale down rotation for better visuals
+
+    def collision_mask(self):
+        # Mask of the rotated car and the screen rect it occupies
+        index = self.rotation_index()
+        mask = self.rotations.masks[index]
+        return mask, mask.get_rect(center=(self.x, self.y))
+
+    def draw(self, screen, alpha=1.0, camera_x=0):
+        # alpha is how far the frame is between the previous tick and the latest one
+        index = self.rotation_index(interpolate(self.prev_direction, self.direction, alpha))
+        rotated_image = self.rotations.images[index]
+        new_rect = rotated_image.get_rect(center=(interpolate(self.prev_x, self.x, alpha) - camera_x, self.y))
+        return screen.blit(rotated_image, new_rect.topleft)
 
-        # Keep player on screen
-        road_left = SCREEN_WIDTH // 2 - ROAD_WIDTH // 2
-        road_right = SCREEN_WIDTH // 2 + ROAD_WIDTH // 2
-        self.x = max(road_left + self.width // 2, min(self.x, road_right - self.width // 2))
+class EnemyCar:
+    __slots__ = ("lane", "x", "y", "prev_y", "speed", "color", "sprite_key", "image")
 
-    def draw(self, screen):
-        rotated_image = pygame.transform.rotate(self.image, -self.direction * 180 / math.pi * 0.5)  # Scale down rotation for better visuals
-        new_rect = rotated_image.get_rect(center=(self.x, self.y))
-        screen.blit(rotated_image, new_rect.topleft)
+    width = 50
+    height = 80
 
-class EnemyCar:
-    def __init__(self, lane):
-        self.width = 50
-        self.height = 80
+    def __init__(self, rng=random, lane=0, road=DEFAULT_ROAD):
+        self.spawn(rng, lane, road)
+
+    def spawn(self, rng, lane, road=DEFAULT_ROAD):
         self.lane = lane
-        self.x = SCREEN_WIDTH // 2 - ROAD_WIDTH // 2 + LANE_WIDTH * lane + LANE_WIDTH // 2
+        self.x = road.lane_center(lane)
         self.y = -100  # Start above the screen
-        self.speed = random.uniform(2, 5)
-
-        # Create a car shape with random color
-        car_color = random.choice([(0, 0, 200), (0, 200, 0), (200, 200, 0), (200, 0, 200), (0, 200, 200)])
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        pygame.draw.rect(self.image, car_color, (0, 0, self.width, self.height), border_radius=10)
-        pygame.draw.rect(self.image, (car_color[0]*0.8, car_color[1]*0.8, car_color[2]*0.8),
-                         (5, 5, self.width-10, self.height-10), border_radius=8)
-        pygame.draw.rect(self.image, (150, 150, 150), (10, 15, self.width-20, 20))  # Windshield
-        pygame.draw.rect(self.image, (150, 150, 150), (10, self.height-35, self.width-20, 20))  # Rear window
-
-    def update(self, player_speed):
+        self.prev_y = self.y
+        self.speed = rng.uniform(2, 5)
+
+        # Pick a random color; the sprite comes from the shared atlas on first draw
+        self.color = rng.choice(CAR_COLORS)
+        self.sprite_key = ("car", self.color)
+        self.image = None
+
+    def update(self, player_speed, scale=1.0):
         # Move relative to player's speed to create passing effect
-        self.y += (self.speed - player_speed)
+        self.prev_y = self.y
+        self.y += (self.speed - player_speed) * scale
 
-    def draw(self, screen):
-        screen.blit(self.image, (self.x - self.width // 2, self.y - self.height // 2))
+    def draw(self, screen, alpha=1.0, camera_x=0):
+        if self.image is None:
+            self.image = get_sprite_atlas()[self.sprite_key]
+        return screen.blit(self.image, (self.x - camera_x - self.width // 2,
+                                        interpolate(self.prev_y, self.y, alpha) - self.height // 2))
 
 class PowerUp:
-    def __init__(self):
-        self.width = 30
-        self.height = 30
-        self.lane = random.randint(0, 2)
-        self.x = SCREEN_WIDTH // 2 - ROAD_WIDTH // 2 + LANE_WIDTH * self.lane + LANE_WIDTH // 2
-        self.y = -100
-        self.speed = 3
-        self.type = random.choice(["speed", "invincible"])
+    __slots__ = ("lane", "x", "y", "prev_y", "type", "sprite_key", "image")
+
+    width = 30
+    height = 30
+    speed = 3
+
+    def __init__(self, rng=random, road=DEFAULT_ROAD):
+        self.spawn(rng, road)
 
-        # Create power-up shape
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        if self.type == "speed":
-            pygame.draw.circle(self.image, (255, 215, 0), (self.width//2, self.height//2), self.width//2)
-            pygame.draw.polygon(self.image, BLACK, [(10, 15), (20, 5), (20, 15), (30, 5), (20, 25), (20, 15), (10, 25)])
-        else:  # invincible
-            pygame.draw.circle(self.image, (0, 255, 255), (self.width//2, self.height//2), self.width//2)
-            pygame.draw.polygon(self.image, BLACK, [(15, 5), (25, 5), (25, 25), (15, 25)])
+    def spawn(self, rng, road=DEFAULT_ROAD):
+        self.lane = rng.randrange(road.lanes)
+        self.x = road.lane_center(self.lane)
+        self.y = -100
+        self.prev_y = self.y
+        self.type = rng.choice(POWERUP_TYPES)
+        self.sprite_key = ("powerup", self.type)
+        self.image = None
 
-    def update(self, player_speed):
-        self.y += (self.speed - player_speed)
+    def update(self, player_speed, scale=1.0):
+        self.prev_y = self.y
+        self.y += (self.speed - player_speed) * scale
 
-    def draw(self, screen):
-        screen.blit(self.image, (self.x - self.width // 2, self.y - self.height // 2))
+    def draw(self, screen, alpha=1.0, camera_x=0):
+        if self.image is None:
+            self.image = get_sprite_atlas()[self.sprite_key]
+        return screen.blit(self.image, (self.x - camera_x - self.width // 2,
+                                        interpolate(self.prev_y, self.y, alpha) - self.height // 2))
 
 class Obstacle:
-    def __init__(self):
-        self.width = 80
-        self.height = 80
-        self.lane = random.randint(0, 2)
-        self.x = SCREEN_WIDTH // 2 - ROAD_WIDTH // 2 + LANE_WIDTH * self.lane + LANE_WIDTH // 2
+    __slots__ = ("lane", "x", "y", "prev_y", "type", "variant", "sprite_key", "image")
+
+    width = 80
+    height = 80
+    speed = 2
+
+    def __init__(self, rng=random, road=DEFAULT_ROAD):
+        self.spawn(rng, road)
+
+    def spawn(self, rng, road=DEFAULT_ROAD):
+        self.lane = rng.randrange(road.lanes)
+        self.x = road.lane_center(self.lane)
         self.y = -100  # Start above the screen
-        self.speed = 2
-
-        # Create obstacle shape (oil spill or rock)
-        self.type = random.choice(["oil", "rock"])
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-
-        if self.type == "oil":
-            # Draw oil spill
-            pygame.draw.ellipse(self.image, (30, 30, 30), (0, 20, self.width, self.height - 20))
-            pygame.draw.ellipse(self.image, (10, 10, 10), (10, 30, self.width - 20, self.height - 40))
-            # Add some shine
-            pygame.draw.ellipse(self.image, (50, 50, 70), (15, 35, 20, 10))
-        else:  # rock
-            # Draw rock
-            points = []
-            center_x, center_y = self.width // 2, self.height // 2
-            for i in range(8):
-                angle = 2 * math.pi * i / 8
-                distance = random.randint(25, 35)
-                x = center_x + math.cos(angle) * distance
-                y = center_y + math.sin(angle) * distance
-                points.append((x, y))
-
-            pygame.draw.polygon(self.image, (100, 100, 100), points)
-            pygame.draw.polygon(self.image, (80, 80, 80), points, 3)
-
-    def update(self, player_speed):
+        self.prev_y = self.y
+
+        # Pick obstacle shape (oil spill or one of the pre-rendered rocks)
+        self.type = rng.choice(["oil", "rock"])
+        if self.type == "rock":
+            self.variant = rng.randrange(ROCK_VARIANTS)
+            self.sprite_key = ("rock", self.variant)
+        else:
+            self.variant = 0
+            self.sprite_key = ("oil",)
+        self.image = None
+
+    def update(self, player_speed, scale=1.0):
         # Move relative to player's speed to create passing effect
-        self.y += (self.speed - player_speed)
-
-    def draw(self, screen):
-        screen.blit(self.image, (self.x - self.width // 2, self.y - self.height // 2))
-
-class Particle:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(3, 8)
-        self.speed_x = random.uniform(-2, 2)
-        self.speed_y = random.uniform(-2, 2)
-        self.life = random.randint(20, 40)
-
-    def update(self):
-        self.x += self.speed_x
-        self.y += self.speed_y
-        self.life -= 1
-        self.size = max(0, self.size - 0.1)
-
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.size))
+        self.prev_y = self.y
+        self.y += (self.speed - player_speed) * scale
+
+    def draw(self, screen, alpha=1.0, camera_x=0):
+        if self.image is None:
+            self.image = get_sprite_atlas()[self.sprite_key]
+        return screen.blit(self.image, (self.x - camera_x - self.width // 2,
+                                        interpolate(self.prev_y, self.y, alpha) - self.height // 2))
+
+class BackgroundLayers:
+    """Pre-rendered scenery and road that scroll with a few blits per frame.
+
+    Clouds are baked onto the sky and trees onto the grass. Each is an
+    opaque tileable surface that is blitted at the current scroll offset,
+    wrapping around with a second copy. The road is filled in and its
+    markings blitted from one pre-rendered dashed column per divider, only
+    for the part of the road within the camera's view, so drawing costs
+    the same however many lanes the road has.
+    """
+
+    def __init__(self, trees, clouds, road=DEFAULT_ROAD):
+        self.road = road
+        self.horizon = horizon = SCREEN_HEIGHT // 3
+
+        # Sky with clouds, tiling horizontally and over half the screen height
+        self.cloud_height = SCREEN_HEIGHT // 2
+        self.sky = pygame.Surface((SCREEN_WIDTH, self.cloud_height))
+        self.sky.fill((135, 206, 235))  # Sky blue
+        for x, y in clouds:
+            for dx in (-SCREEN_WIDTH, 0, SCREEN_WIDTH):
+                for dy in (-self.cloud_height, 0, self.cloud_height):
+                    pygame.draw.ellipse(self.sky, WHITE, (x+dx, y+dy, 100, 40))
+                    pygame.draw.ellipse(self.sky, WHITE, (x+dx+25, y+dy-15, 70, 30))
+                    pygame.draw.ellipse(self.sky, WHITE, (x+dx+60, y+dy+5, 50, 25))
+        self.sky_rect = pygame.Rect(0, 0, SCREEN_WIDTH, horizon)
+
+        # Grass with trees, tiling in both directions
+        self.grass = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.grass.fill(GREEN)
+        for x, y in trees:
+            for dx in (-SCREEN_WIDTH, 0, SCREEN_WIDTH):
+                for dy in (-SCREEN_HEIGHT, 0, SCREEN_HEIGHT):
+                    # Tree trunk
+                    pygame.draw.rect(self.grass, (139, 69, 19), (x+dx, y+dy, 10, 30))
+                    # Tree leaves
+                    pygame.draw.circle(self.grass, (34, 139, 34), (x+dx+5, y+dy-15), 25)
+        self.grass_rect = pygame.Rect(0, horizon, SCREEN_WIDTH, SCREEN_HEIGHT - horizon)
+
+        # Dashed marking columns with one extra period so they can scroll
+        self.markings = {}
+        for color in (WHITE, YELLOW):
+            column = pygame.Surface((ROAD_MARK_WIDTH, SCREEN_HEIGHT + 100))
+            column.fill(DARK_GRAY)
+            for y in range(0, SCREEN_HEIGHT + 100, 100):
+                pygame.draw.rect(column, color, (0, y, ROAD_MARK_WIDTH, 50))
+            self.markings[color] = column
+
+        self.drawn_camera = None
+        self.drawn_clouds = None
+        self.drawn_trees = None
+        self.drawn_road = None
+
+        if pygame.display.get_surface() is not None:
+            self.sky = self.sky.convert()
+            self.grass = self.grass.convert()
+            self.markings = {color: column.convert() for color, column in self.markings.items()}
+
+    def road_span(self, camera_x):
+        # Screen x range covered by the road and its edge lines
+        return self.road.left - 5 - camera_x, self.road.right + 5 - camera_x
+
+    def draw_background(self, screen, cloud_x, cloud_y, tree_y, camera_x=0):
+        """Draw the sky and grass and return the screen rects that changed."""
+        dirty = []
+        clip = screen.get_clip()
+        camera_x = int(camera_x)
+        if camera_x != self.drawn_camera:
+            # Everything on screen moves sideways, so all of it changes
+            self.drawn_camera = camera_x
+            self.drawn_clouds = self.drawn_trees = self.drawn_road = None
+            dirty.append(pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
+
+        # The road covers the middle of the background, so only the strips beside it can change
+        road_left, road_right = self.road_span(camera_x)
+        road_left = max(road_left, 0)
+        road_right = min(road_right, SCREEN_WIDTH)
+
+        screen.set_clip(self.sky_rect)
+        x = int(cloud_x)
+        y = int(cloud_y)
+        for dx in (x - SCREEN_WIDTH, x):
+            for dy in (y - self.cloud_height, y):
+                screen.blit(self.sky, (dx, dy))
+        if (x, y) != self.drawn_clouds:
+            self.drawn_clouds = (x, y)
+            dirty.append(pygame.Rect(0, 0, road_left, self.horizon))
+            dirty.append(pygame.Rect(road_right, 0, SCREEN_WIDTH - road_right, self.horizon))
+
+        # Grass scrolls sideways with the camera
+        screen.set_clip(self.grass_rect)
+        x = -camera_x % SCREEN_WIDTH
+        y = int(tree_y)
+        for dx in ((x - SCREEN_WIDTH, x) if x else (0,)):
+            screen.blit(self.grass, (dx, y - SCREEN_HEIGHT))
+            screen.blit(self.grass, (dx, y))
+        if y != self.drawn_trees:
+            self.drawn_trees = y
+            dirty.append(pygame.Rect(0, self.horizon, road_left, SCREEN_HEIGHT - self.horizon))
+            dirty.append(pygame.Rect(road_right, self.horizon, SCREEN_WIDTH - road_right, SCREEN_HEIGHT - self.horizon))
+
+        screen.set_clip(clip)
+        return dirty
+
+    def draw_road(self, screen, road_y, camera_x=0):
+        """Draw the visible part of the road and return the screen rects that changed."""
+        road = self.road
+        camera_x = int(camera_x)
+        road_left, road_right = self.road_span(camera_x)
+        visible_left = max(road_left, 0)
+        screen.fill(DARK_GRAY, (visible_left, 0, min(road_right, SCREEN_WIDTH) - visible_left, SCREEN_HEIGHT))
+
+        # Road edges
+        screen.fill(WHITE, (road_left, 0, 5, SCREEN_HEIGHT))
+        screen.fill(WHITE, (road_right - 5, 0, 5, SCREEN_HEIGHT))
+
+        # Markings of the dividers in view, with the centre line in yellow
+        y = int(road_y)
+        first, last = road.visible_lanes(camera_x, ROAD_MARK_WIDTH)
+        columns = {x: WHITE for x in road.dividers[max(first - 1, 0):last + 1]}
+        if camera_x - ROAD_MARK_WIDTH < road.center < camera_x + SCREEN_WIDTH + ROAD_MARK_WIDTH:
+            columns[road.center] = YELLOW
+        strips = []
+        for x, color in columns.items():
+            left = x - ROAD_MARK_WIDTH // 2 - camera_x
+            screen.blit(self.markings[color], (left, y - 100))
+            strips.append(pygame.Rect(left, 0, ROAD_MARK_WIDTH, SCREEN_HEIGHT))
+
+        if y != self.drawn_road:
+            self.drawn_road = y
+            return strips
+        return []
+
+class DirtyRectRenderer:
+    """Presents only the parts of the frame that changed since the last one.
+
+    Draw code reports every rect it touched with add(). present() pushes
+    those rects plus last frame's (so old positions get erased) with
+    pygame.display.update, or the whole window after invalidate().
+    pixels_pushed holds the number of pixels sent for the latest frame.
+    """
 
-class Game:
     def __init__(self):
+        self.screen_rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.rects = []
+        self.previous = []
+        self.full = True
+        self.pixels_pushed = 0
+        self.total_pixels = 0
+        self.frames = 0
+
+    def add(self, rect):
+        self.rects.append(rect)
+
+    def extend(self, rects):
+        self.rects.extend(rects)
+
+    def invalidate(self):
+        self.full = True
+
+    def merge(self, rects):
+        # Union overlapping rects so no pixel is pushed twice
+        merged = []
+        for rect in rects:
+            rect = rect.clip(self.screen_rect)
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect.union_ip(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def present(self):
+        if self.full:
+            pygame.display.flip()
+            self.pixels_pushed = SCREEN_WIDTH * SCREEN_HEIGHT
+            self.previous = []
+            self.full = False
+        else:
+            update_rects = self.merge(self.previous + self.rects)
+            pygame.display.update(update_rects)
+            self.pixels_pushed = sum(rect.width * rect.height for rect in update_rects)
+            self.previous = self.rects
+        self.rects = []
+        self.total_pixels += self.pixels_pushed
+        self.frames += 1
+
+class KeyState:
+    """Stand-in for pygame.key.get_pressed() built from a set of pressed keys.
+
+    Headless runs feed these into Game.update instead of polling the keyboard.
+    """
+
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+# Rendered strings kept by each Game's TextCache
+TEXT_CACHE_SIZE = 64
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by font, string and colour.
+
+    Static labels are rendered once and numeric readouts only when their
+    displayed value (and so their string) changes. Surfaces are converted
+    to the display format when one is set, like the sprite atlas.
+    """
+
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        surface = font.render(text, True, color)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        self.misses += 1
+        return surface
+
+class Game:
+    def __init__(self, headless=False, seed=None, sim_rate=FPS, road=DEFAULT_ROAD,
+                 max_enemies=MAX_ENEMY_CARS, max_power_ups=MAX_POWER_UPS, max_obstacles=MAX_OBSTACLES):
+        self.headless = headless
+        self.road = road
+
+        # Ticks per second of simulated time. The rules are written per
+        # 1/FPS tick, so every per-tick change is scaled by step_scale.
+        self.sim_rate = sim_rate
+        self.step_scale = FPS / sim_rate
+
+        # All gameplay randomness comes from this generator, so a seed plus
+        # the per-frame key states reproduces a session exactly
+        if seed is None:
+            seed = random.randrange(SEED_LIMIT)
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        # Entities are recycled through fixed-size pools
+        self.enemy_pool = EntityPool(EnemyCar, max_enemies)
+        self.powerup_pool = EntityPool(PowerUp, max_power_ups)
+        self.obstacle_pool = EntityPool(Obstacle, max_obstacles)
+        self.enemy_cars = []
+        self.power_ups = []
+        self.obstacles = []
+        self.particles = ParticleSystem(seed=seed)
+
+        # Per-lane, y-ordered views of the same entities for collision queries
+        self.enemy_index = LaneIndex(road.lanes)
+        self.powerup_index = LaneIndex(road.lanes)
+        self.obstacle_index = LaneIndex(road.lanes)
+
+        # Set to a car_racing_traffic.TrafficModel to drive the enemy cars
+        self.traffic = None
+
+        # Set to a car_racing_ghosts.GhostSet to race against earlier runs
+        self.ghosts = None
+
         self.reset()
         self.state = MENU
-        self.font = pygame.font.SysFont(None, 36)
-        self.big_font = pygame.font.SysFont(None, 72)
 
-        # Background elements
-        self.trees = [(random.randint(0, SCREEN_WIDTH), random.randint(0, SCREEN_HEIGHT)) for _ in range(20)]
-        self.clouds = [(random.randint(0, SCREEN_WIDTH), random.randint(0, SCREEN_HEIGHT//3), random.uniform(0.5, 1.5))
-                      for _ in range(10)]
+        # Fonts are loaded on the first draw, so headless games never touch pygame.font
+        self.font = None
+        self.big_font = None
+        self.text_cache = TextCache()
+
+        # Background elements, baked into scrolling layers on first draw
+        self.trees = [(self.rng.randint(0, SCREEN_WIDTH), self.rng.randint(0, SCREEN_HEIGHT)) for _ in range(20)]
+        self.clouds = [(self.rng.randint(0, SCREEN_WIDTH), self.rng.randint(0, SCREEN_HEIGHT//3)) for _ in range(10)]
+        self.tree_y = 0
+        self.cloud_x = 0
+        self.cloud_y = 0
+        self.layers = None
+
+        # World x shown at the left edge of the screen, set on each draw
+        self.camera_x = 0
+
+        # Set to a car_racing_pseudo3d.Pseudo3DView to draw in perspective instead of top-down
+        self.view = None
+
+        # Set to a DirtyRectRenderer to track which screen regions change
+        self.renderer = None
+        self.drawn_state = None
+
+        # Set to a FrameProfiler to time each phase of update and draw
+        self.profiler = None
 
     def reset(self):
-        self.player = PlayerCar()
-        self.enemy_cars = []
-        self.power_ups = []
-        self.obstacles = []
-        self.particles = []
+        self.player = PlayerCar(self.road)
+
+        # Hand every live entity back to its pool
+        self.enemy_pool.release_all(self.enemy_cars)
+        self.powerup_pool.release_all(self.power_ups)
+        self.obstacle_pool.release_all(self.obstacles)
+        self.enemy_cars.clear()
+        self.power_ups.clear()
+        self.obstacles.clear()
+        self.enemy_index.clear()
+        self.powerup_index.clear()
+        self.obstacle_index.clear()
+        self.particles.clear()
+        if self.traffic is not None:
+            self.traffic.reset()
+        if self.ghosts is not None:
+            self.ghosts.restart()
         self.road_y = 0
         self.score = 0
         self.distance = 0
@@ -230,27 +772,75 @@ class Game:
         self.invincible_timer = 0
         self.speed_boost = False
         self.speed_boost_timer = 0
+        self.previous_scroll = None
+        self.crash_cause = None  # "car", "oil" or "rock" once the race ends
+
+    def player_collides(self, entity):
+        # Exact test between the rotated player outline and the entity sprite
+        player_mask, player_rect = self.player_hitbox
+        top = int(entity.y - entity.height // 2)
+        if top >= player_rect.bottom or top + entity.height <= player_rect.top:
+            return False
+        left = int(entity.x - entity.width // 2)
+        if left >= player_rect.right or left + entity.width <= player_rect.left:
+            return False
+        entity_mask = get_sprite_atlas().masks[entity.sprite_key]
+        return player_mask.overlap(entity_mask, (left - player_rect.x, top - player_rect.y)) is not None
+
+    def nearby(self, index, entity_type):
+        # Entities of one type whose bounding box can touch the player's
+        _, player_rect = self.player_hitbox
+        half_width = entity_type.width // 2
+        half_height = entity_type.height // 2
+        return index.query(self.road.lane_at(player_rect.left - half_width),
+                           self.road.lane_at(player_rect.right + half_width),
+                           player_rect.top - half_height, player_rect.bottom + half_height)
 
     def spawn_enemy(self):
-        # Determine which lanes are occupied
-        occupied_lanes = [car.lane for car in self.enemy_cars if car.y < 200]
-        available_lanes = [i for i in range(3) if i not in occupied_lanes]
+        # Determine which lanes are free near the top of the screen
+        available_lanes = [i for i in range(self.road.lanes) if not self.enemy_index.lane_occupied(i, 200)]
 
         if available_lanes:
-            lane = random.choice(available_lanes)
-            self.enemy_cars.append(EnemyCar(lane))
+            lane = self.rng.choice(available_lanes)
+            if self.traffic is not None:
+                self.traffic.spawn(lane, self.rng)
+                return
+            car = self.enemy_pool.acquire(self.rng, lane, self.road)
+            if car is not None:
+                self.enemy_cars.append(car)
+                self.enemy_index.add(car)
 
     def spawn_powerup(self):
-        if random.random() < 0.3:  # 30% chance to spawn a power-up
-            self.power_ups.append(PowerUp())
+        if self.rng.random() < 0.3:  # 30% chance to spawn a power-up
+            powerup = self.powerup_pool.acquire(self.rng, self.road)
+            if powerup is not None:
+                self.power_ups.append(powerup)
+                self.powerup_index.add(powerup)
 
     def spawn_obstacle(self):
-        if random.random() < 0.4:  # 40% chance to spawn an obstacle
-            self.obstacles.append(Obstacle())
+        if self.rng.random() < 0.4:  # 40% chance to spawn an obstacle
+            obstacle = self.obstacle_pool.acquire(self.rng, self.road)
+            if obstacle is not None:
+                self.obstacles.append(obstacle)
+                self.obstacle_index.add(obstacle)
+
+    def remove_entity(self, entities, pool, index, entity):
+        entities.remove(entity)
+        index.remove(entity)
+        pool.release(entity)
+
+    def pool_stats(self):
+        return {
+            "enemy_cars": self.enemy_pool.stats(),
+            "power_ups": self.powerup_pool.stats(),
+            "obstacles": self.obstacle_pool.stats(),
+        }
 
     def create_particles(self, x, y, color, count=10):
-        for _ in range(count):
-            self.particles.append(Particle(x, y, color))
+        # Particles are purely visual, so headless runs don't simulate them
+        if self.headless:
+            return
+        self.particles.emit(x, y, color, count)
 
     def update_menu(self, keys):
         if keys[pygame.K_RETURN]:
@@ -258,50 +848,56 @@ class Game:
             self.reset()
 
     def update_playing(self, keys):
+        scale = self.step_scale
+        self.previous_scroll = (self.road_y, self.tree_y, self.cloud_x, self.cloud_y)
+
         # Update player
-        old_speed = self.player.speed
-        self.player.update(keys)
+        self.player.update(keys, scale)
+        self.player_hitbox = self.player.collision_mask()
 
-        # Create exhaust particles
-        if self.player.speed > 0 and random.random() < 0.3:
+        # Create exhaust particles (drawn from the particle RNG so visuals never
+        # disturb the gameplay random sequence)
+        if self.player.speed > 0 and self.particles.rng.random() < 0.3 * scale:
             angle = self.player.direction + math.pi  # Opposite direction
             exhaust_x = self.player.x - math.sin(angle) * self.player.height / 2
             exhaust_y = self.player.y - math.cos(angle) * self.player.height / 2
             self.create_particles(exhaust_x, exhaust_y, (100, 100, 100), 2)
 
         # Update road position based on player speed
-        self.road_y = (self.road_y + self.player.speed) % 100
-
-        # Update background elements
-        for i, (x, y) in enumerate(self.trees):
-            new_y = (y + self.player.speed) % SCREEN_HEIGHT
-            self.trees[i] = (x, new_y)
+        self.road_y = (self.road_y + self.player.speed * scale) % 100
 
-        for i, (x, y, speed) in enumerate(self.clouds):
-            new_x = (x + speed * 0.2) % SCREEN_WIDTH
-            new_y = (y + self.player.speed * 0.2) % (SCREEN_HEIGHT // 2)
-            self.clouds[i] = (new_x, new_y, speed)
+        # Update background scroll offsets
+        self.tree_y = (self.tree_y + self.player.speed * scale) % SCREEN_HEIGHT
+        self.cloud_x = (self.cloud_x + 0.2 * scale) % SCREEN_WIDTH
+        self.cloud_y = (self.cloud_y + self.player.speed * 0.2 * scale) % (SCREEN_HEIGHT // 2)
 
         # Update distance
-        self.distance += self.player.speed / 10
+        self.distance += self.player.speed / 10 * scale
 
         # Update game time
-        self.game_time += 1/FPS
+        self.game_time += 1/FPS * scale
+        if self.profiler is not None:
+            self.profiler.mark("player")
 
         # Update particles
-        for particle in self.particles[:]:
-            particle.update()
-            if particle.life <= 0:
-                self.particles.remove(particle)
+        self.particles.update(scale)
+        if self.profiler is not None:
+            self.profiler.mark("particles")
 
         # Update power-ups
         for powerup in self.power_ups[:]:
-            powerup.update(self.player.speed)
+            powerup.update(self.player.speed, scale)
+
+            # Remove if off screen
+            if powerup.y > SCREEN_HEIGHT + 100 or powerup.y < DESPAWN_ABOVE:
+                self.remove_entity(self.power_ups, self.powerup_pool, self.powerup_index, powerup)
+        self.powerup_index.resort()
 
-            # Check if power-up is collected
+        # Check if power-ups near the player are collected
+        for powerup in self.nearby(self.powerup_index, PowerUp) if self.power_ups else ():
             if (abs(powerup.x - self.player.x) < (powerup.width + self.player.width) // 2 and
                 abs(powerup.y - self.player.y) < (powerup.height + self.player.height) // 2):
-                self.power_ups.remove(powerup)
+                self.remove_entity(self.power_ups, self.powerup_pool, self.powerup_index, powerup)
 
                 if powerup.type == "speed":
                     self.speed_boost = True
@@ -312,79 +908,93 @@ class Game:
                     self.invincible_timer = FPS * 5  # 5 seconds
 
                 self.create_particles(powerup.x, powerup.y, (255, 255, 0), 20)
-
-            # Remove if off screen
-            if powerup.y > SCREEN_HEIGHT + 100:
-                self.power_ups.remove(powerup)
+        if self.profiler is not None:
+            self.profiler.mark("power-ups")
 
         # Update obstacles
         for obstacle in self.obstacles[:]:
-            obstacle.update(self.player.speed)
+            obstacle.update(self.player.speed, scale)
 
-            # Check if obstacle is hit
-            if (abs(obstacle.x - self.player.x) < (obstacle.width + self.player.width) // 2 * 0.7 and
-                abs(obstacle.y - self.player.y) < (obstacle.height + self.player.height) // 2 * 0.7):
+            # Remove if off screen
+            if obstacle.y > SCREEN_HEIGHT + 100 or obstacle.y < DESPAWN_ABOVE:
+                self.remove_entity(self.obstacles, self.obstacle_pool, self.obstacle_index, obstacle)
+        self.obstacle_index.resort()
+
+        # Check if an obstacle near the player is hit
+        for obstacle in self.nearby(self.obstacle_index, Obstacle) if self.obstacles else ():
+            if self.player_collides(obstacle):
                 if not self.invincible:
                     self.create_particles(self.player.x, self.player.y, RED, 30)
+                    self.crash_cause = obstacle.type
                     self.state = GAME_OVER
                     return False
                 else:
                     # If invincible, destroy the obstacle
-                    self.obstacles.remove(obstacle)
+                    self.remove_entity(self.obstacles, self.obstacle_pool, self.obstacle_index, obstacle)
                     self.create_particles(obstacle.x, obstacle.y, (100, 100, 100), 15)
-                    continue
-
-            # Remove if off screen
-            if obstacle.y > SCREEN_HEIGHT + 100:
-                self.obstacles.remove(obstacle)
+        if self.profiler is not None:
+            self.profiler.mark("obstacles")
 
         # Update enemy cars
-        for car in self.enemy_cars[:]:
-            car.update(self.player.speed)
-
-            # Check if car is passed
-            if car.y > SCREEN_HEIGHT + 100:
-                self.enemy_cars.remove(car)
-                self.score += 10
-
-            # Check for collision
-            if not self.invincible and (
-                abs(car.x - self.player.x) < (car.width + self.player.width) // 2 * 0.8 and
-                abs(car.y - self.player.y) < (car.height + self.player.height) // 2 * 0.8):
-                self.create_particles(self.player.x, self.player.y, RED, 30)
-                self.state = GAME_OVER
-                return False
+        if self.traffic is not None:
+            self.score += self.traffic.update(self, scale)
+        else:
+            for car in self.enemy_cars[:]:
+                car.update(self.player.speed, scale)
+
+                # Check if car is passed
+                if car.y > SCREEN_HEIGHT + 100:
+                    self.remove_entity(self.enemy_cars, self.enemy_pool, self.enemy_index, car)
+                    self.score += 10
+
+                # Drop cars the player has left far behind
+                elif car.y < DESPAWN_ABOVE:
+                    self.remove_entity(self.enemy_cars, self.enemy_pool, self.enemy_index, car)
+        self.enemy_index.resort()
+
+        # Check for collision with cars near the player
+        if not self.invincible and self.enemy_cars:
+            for car in self.nearby(self.enemy_index, EnemyCar):
+                if self.player_collides(car):
+                    self.create_particles(self.player.x, self.player.y, RED, 30)
+                    self.crash_cause = "car"
+                    self.state = GAME_OVER
+                    return False
+        if self.profiler is not None:
+            self.profiler.mark("enemies")
 
         # Update power-up timers
         if self.speed_boost:
-            self.speed_boost_timer -= 1
+            self.speed_boost_timer -= scale
             if self.speed_boost_timer <= 0:
                 self.speed_boost = False
                 self.player.max_speed = 10  # Reset max speed
 
         if self.invincible:
-            self.invincible_timer -= 1
+            self.invincible_timer -= scale
             if self.invincible_timer <= 0:
                 self.invincible = False
 
-        # Spawn new enemy cars
-        self.spawn_timer += 1
+        # Spawn new enemy cars (timers count 1/FPS ticks)
+        self.spawn_timer += scale
         spawn_interval = max(FPS * 1.5, FPS * 3 - self.game_time / 10)  # Spawn faster as time goes on
         if self.spawn_timer >= spawn_interval:
             self.spawn_enemy()
             self.spawn_timer = 0
 
         # Spawn power-ups
-        self.powerup_spawn_timer += 1
+        self.powerup_spawn_timer += scale
         if self.powerup_spawn_timer >= FPS * 10:  # Every 10 seconds
             self.spawn_powerup()
             self.powerup_spawn_timer = 0
 
         # Spawn obstacles
-        self.obstacle_spawn_timer += 1
+        self.obstacle_spawn_timer += scale
         if self.obstacle_spawn_timer >= FPS * 5:  # Every 5 seconds
             self.spawn_obstacle()
             self.obstacle_spawn_timer = 0
+        if self.profiler is not None:
+            self.profiler.mark("spawning")
 
         return True
 
@@ -395,168 +1005,330 @@ class Game:
     def update(self, keys):
         if self.state == MENU:
             self.update_menu(keys)
-            return True
         elif self.state == PLAYING:
             return self.update_playing(keys)
         elif self.state == GAME_OVER:
             self.update_game_over(keys)
-            return True
-
-    def draw_background(self, screen):
-        # Draw sky
-        screen.fill((135, 206, 235))  # Sky blue
-
-        # Draw clouds
-        for x, y, _ in self.clouds:
-            pygame.draw.ellipse(screen, WHITE, (x, y, 100, 40))
-            pygame.draw.ellipse(screen, WHITE, (x+25, y-15, 70, 30))
-            pygame.draw.ellipse(screen, WHITE, (x+60, y+5, 50, 25))
-
-        # Draw grass
-        pygame.draw.rect(screen, GREEN, (0, SCREEN_HEIGHT//3, SCREEN_WIDTH, SCREEN_HEIGHT*2//3))
-
-        # Draw trees
-        for x, y in self.trees:
-            if y > SCREEN_HEIGHT//3:  # Only draw trees on grass
-                # Tree trunk
-                pygame.draw.rect(screen, (139, 69, 19), (x, y, 10, 30))
-                # Tree leaves
-                pygame.draw.circle(screen, (34, 139, 34), (x+5, y-15), 25)
-
-    def draw_road(self, screen):
-        # Draw road
-        pygame.draw.rect(screen, DARK_GRAY, (SCREEN_WIDTH//2 - ROAD_WIDTH//2, 0, ROAD_WIDTH, SCREEN_HEIGHT))
-
-        # Draw road markings
-        for i in range(-1, SCREEN_HEIGHT // 50 + 1):
-            y = (i * 100 + self.road_y) % SCREEN_HEIGHT
-            # Center line
-            pygame.draw.rect(screen, YELLOW, (SCREEN_WIDTH//2 - ROAD_MARK_WIDTH//2, y, ROAD_MARK_WIDTH, 50))
-
-            # Lane dividers
-            pygame.draw.rect(screen, WHITE, (SCREEN_WIDTH//2 - ROAD_WIDTH//6 - ROAD_MARK_WIDTH//2, y, ROAD_MARK_WIDTH, 50))
-            pygame.draw.rect(screen, WHITE, (SCREEN_WIDTH//2 + ROAD_WIDTH//6 - ROAD_MARK_WIDTH//2, y, ROAD_MARK_WIDTH, 50))
-
-        # Draw road edges
-        pygame.draw.rect(screen, WHITE, (SCREEN_WIDTH//2 - ROAD_WIDTH//2 - 5, 0, 5, SCREEN_HEIGHT))
-        pygame.draw.rect(screen, WHITE, (SCREEN_WIDTH//2 + ROAD_WIDTH//2, 0, 5, SCREEN_HEIGHT))
+        if self.profiler is not None:
+            self.profiler.mark("menu")
+        return True
+
+    def get_layers(self):
+        if self.layers is None:
+            self.layers = BackgroundLayers(self.trees, self.clouds, self.road)
+        return self.layers
+
+    def mark_dirty(self, rect):
+        if self.renderer is not None:
+            self.renderer.add(rect)
+
+    def draw_background(self, screen, alpha=1.0):
+        cloud_x, cloud_y, tree_y = self.cloud_x, self.cloud_y, self.tree_y
+        if self.previous_scroll is not None:
+            _, prev_tree_y, prev_cloud_x, prev_cloud_y = self.previous_scroll
+            cloud_x = interpolate_wrapped(prev_cloud_x, cloud_x, SCREEN_WIDTH, alpha)
+            cloud_y = interpolate_wrapped(prev_cloud_y, cloud_y, SCREEN_HEIGHT // 2, alpha)
+            tree_y = interpolate_wrapped(prev_tree_y, tree_y, SCREEN_HEIGHT, alpha)
+        dirty = self.get_layers().draw_background(screen, cloud_x, cloud_y, tree_y, self.camera_x)
+        if self.renderer is not None:
+            self.renderer.extend(dirty)
+        if self.profiler is not None:
+            self.profiler.mark("background")
+
+    def draw_road(self, screen, alpha=1.0):
+        road_y = self.road_y
+        if self.previous_scroll is not None:
+            road_y = interpolate_wrapped(self.previous_scroll[0], road_y, 100, alpha)
+        dirty = self.get_layers().draw_road(screen, road_y, self.camera_x)
+        if self.renderer is not None:
+            self.renderer.extend(dirty)
+        if self.profiler is not None:
+            self.profiler.mark("road")
+
+    def draw_scenery(self, screen, alpha=1.0):
+        if self.view is not None:
+            self.mark_dirty(self.view.draw_scenery(self, screen, alpha))
+            if self.profiler is not None:
+                self.profiler.mark("road")
+            return
+        self.draw_background(screen, alpha)
+        self.draw_road(screen, alpha)
+
+    def visible(self, entities, index, entity_type):
+        # Entities that can overlap the camera's view; culling only pays off on a scrolling road
+        if not self.road.scrolls:
+            return entities
+        first, last = self.road.visible_lanes(self.camera_x, entity_type.width // 2)
+        return index.query(first, last, -entity_type.height, SCREEN_HEIGHT + entity_type.height)
 
     def draw_menu(self, screen):
-        self.draw_background(screen)
-        self.draw_road(screen)
+        self.draw_scenery(screen)
 
         # Draw title
-        title_text = self.big_font.render("RACING GAME", True, WHITE)
-        screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, SCREEN_HEIGHT//4))
+        title_text = self.text_cache.render(self.big_font, "RACING GAME", WHITE)
+        self.mark_dirty(screen.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, SCREEN_HEIGHT//4)))
 
         # Draw instructions
         if int(pygame.time.get_ticks() / 500) % 2 == 0:  # Blinking effect
-            start_text = self.font.render("Press ENTER to Start", True, WHITE)
-            screen.blit(start_text, (SCREEN_WIDTH//2 - start_text.get_width()//2, SCREEN_HEIGHT//2))
+            start_text = self.text_cache.render(self.font, "Press ENTER to Start", WHITE)
+            self.mark_dirty(screen.blit(start_text, (SCREEN_WIDTH//2 - start_text.get_width()//2, SCREEN_HEIGHT//2)))
 
         # Draw controls
-        controls_text = self.font.render("Controls: Arrow Keys", True, WHITE)
-        screen.blit(controls_text, (SCREEN_WIDTH//2 - controls_text.get_width()//2, SCREEN_HEIGHT*2//3))
-
-    def draw_playing(self, screen):
-        self.draw_background(screen)
-        self.draw_road(screen)
+        controls_text = self.text_cache.render(self.font, "Controls: Arrow Keys", WHITE)
+        self.mark_dirty(screen.blit(controls_text, (SCREEN_WIDTH//2 - controls_text.get_width()//2, SCREEN_HEIGHT*2//3)))
+        if self.profiler is not None:
+            self.profiler.mark("hud")
+
+    def draw_playing(self, screen, alpha=1.0):
+        self.draw_scenery(screen, alpha)
+        if self.view is not None:
+            self.mark_dirty(self.view.draw_sprites(self, screen, alpha))
+            if self.profiler is not None:
+                self.profiler.mark("entities")
+            self.draw_hud(screen)
+            return
 
         # Draw obstacles
-        for obstacle in self.obstacles:
-            obstacle.draw(screen)
+        camera_x = self.camera_x
+        for obstacle in self.visible(self.obstacles, self.obstacle_index, Obstacle):
+            self.mark_dirty(obstacle.draw(screen, alpha, camera_x))
 
         # Draw power-ups
-        for powerup in self.power_ups:
-            powerup.draw(screen)
+        for powerup in self.visible(self.power_ups, self.powerup_index, PowerUp):
+            self.mark_dirty(powerup.draw(screen, alpha, camera_x))
 
         # Draw enemy cars
-        for car in self.enemy_cars:
-            car.draw(screen)
+        for car in self.visible(self.enemy_cars, self.enemy_index, EnemyCar):
+            self.mark_dirty(car.draw(screen, alpha, camera_x))
+
+        # Draw ghosts of earlier runs under the player
+        if self.ghosts is not None:
+            ghosts_rect = self.ghosts.draw(self, screen, alpha, camera_x)
+            if ghosts_rect is not None:
+                self.mark_dirty(ghosts_rect)
 
         # Draw player with special effects if powered up
         if self.invincible:
             if int(pygame.time.get_ticks() / 100) % 2 == 0:  # Blinking effect
-                self.player.draw(screen)
+                self.mark_dirty(self.player.draw(screen, alpha, camera_x))
         else:
-            self.player.draw(screen)
+            self.mark_dirty(self.player.draw(screen, alpha, camera_x))
 
         # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
-
-        # Draw UI
+        particles_rect = self.particles.draw(screen, camera_x)
+        if particles_rect is not None:
+            self.mark_dirty(particles_rect)
+        if self.profiler is not None:
+            self.profiler.mark("entities")
+        self.draw_hud(screen)
+
+    def draw_hud(self, screen):
         # Speedometer
-        speed_text = self.font.render(f"Speed: {int(self.player.speed * 10)} km/h", True, WHITE)
-        screen.blit(speed_text, (20, 20))
+        speed_text = self.text_cache.render(self.font, f"Speed: {int(self.player.speed * 10)} km/h", WHITE)
+        self.mark_dirty(screen.blit(speed_text, (20, 20)))
 
         # Speed bar
-        pygame.draw.rect(screen, BLACK, (20, 60, 200, 20))
+        self.mark_dirty(pygame.draw.rect(screen, BLACK, (20, 60, 200, 20)))
         speed_ratio = self.player.speed / self.player.max_speed
         bar_color = GREEN if not self.speed_boost else YELLOW
-        pygame.draw.rect(screen, bar_color, (20, 60, int(200 * speed_ratio), 20))
+        self.mark_dirty(pygame.draw.rect(screen, bar_color, (20, 60, int(200 * speed_ratio), 20)))
 
         # Score
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        screen.blit(score_text, (20, 100))
+        score_text = self.text_cache.render(self.font, f"Score: {self.score}", WHITE)
+        self.mark_dirty(screen.blit(score_text, (20, 100)))
 
         # Distance
-        distance_text = self.font.render(f"Distance: {int(self.distance)} m", True, WHITE)
-        screen.blit(distance_text, (20, 140))
+        distance_text = self.text_cache.render(self.font, f"Distance: {int(self.distance)} m", WHITE)
+        self.mark_dirty(screen.blit(distance_text, (20, 140)))
 
         # Time
-        time_text = self.font.render(f"Time: {int(self.game_time)} s", True, WHITE)
-        screen.blit(time_text, (20, 180))
+        time_text = self.text_cache.render(self.font, f"Time: {int(self.game_time)} s", WHITE)
+        self.mark_dirty(screen.blit(time_text, (20, 180)))
 
         # Power-up indicators
         if self.speed_boost:
-            boost_text = self.font.render(f"Speed Boost: {self.speed_boost_timer//FPS + 1}s", True, YELLOW)
-            screen.blit(boost_text, (SCREEN_WIDTH - 250, 20))
+            boost_text = self.text_cache.render(self.font, f"Speed Boost: {int(self.speed_boost_timer // FPS) + 1}s", YELLOW)
+            self.mark_dirty(screen.blit(boost_text, (SCREEN_WIDTH - 250, 20)))
 
         if self.invincible:
-            invincible_text = self.font.render(f"Invincible: {self.invincible_timer//FPS + 1}s", True, (0, 255, 255))
-            screen.blit(invincible_text, (SCREEN_WIDTH - 250, 60))
+            invincible_text = self.text_cache.render(self.font, f"Invincible: {int(self.invincible_timer // FPS) + 1}s", (0, 255, 255))
+            self.mark_dirty(screen.blit(invincible_text, (SCREEN_WIDTH - 250, 60)))
+        if self.profiler is not None:
+            self.profiler.mark("hud")
 
     def draw_game_over(self, screen):
-        self.draw_background(screen)
-        self.draw_road(screen)
+        self.draw_scenery(screen)
 
         # Draw game over text
-        game_over_text = self.big_font.render("GAME OVER", True, RED)
-        screen.blit(game_over_text, (SCREEN_WIDTH//2 - game_over_text.get_width()//2, SCREEN_HEIGHT//3))
+        game_over_text = self.text_cache.render(self.big_font, "GAME OVER", RED)
+        self.mark_dirty(screen.blit(game_over_text, (SCREEN_WIDTH//2 - game_over_text.get_width()//2, SCREEN_HEIGHT//3)))
 
         # Draw score
-        score_text = self.font.render(f"Final Score: {self.score}", True, WHITE)
-        screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, SCREEN_HEIGHT//2))
+        score_text = self.text_cache.render(self.font, f"Final Score: {self.score}", WHITE)
+        self.mark_dirty(screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, SCREEN_HEIGHT//2)))
 
         # Draw distance
-        distance_text = self.font.render(f"Distance: {int(self.distance)} m", True, WHITE)
-        screen.blit(distance_text, (SCREEN_WIDTH//2 - distance_text.get_width()//2, SCREEN_HEIGHT//2 + 40))
+        distance_text = self.text_cache.render(self.font, f"Distance: {int(self.distance)} m", WHITE)
+        self.mark_dirty(screen.blit(distance_text, (SCREEN_WIDTH//2 - distance_text.get_width()//2, SCREEN_HEIGHT//2 + 40)))
 
         # Draw time
-        time_text = self.font.render(f"Time: {int(self.game_time)} s", True, WHITE)
-        screen.blit(time_text, (SCREEN_WIDTH//2 - time_text.get_width()//2, SCREEN_HEIGHT//2 + 80))
+        time_text = self.text_cache.render(self.font, f"Time: {int(self.game_time)} s", WHITE)
+        self.mark_dirty(screen.blit(time_text, (SCREEN_WIDTH//2 - time_text.get_width()//2, SCREEN_HEIGHT//2 + 80)))
 
         # Draw restart instruction
         if int(pygame.time.get_ticks() / 500) % 2 == 0:  # Blinking effect
-            restart_text = self.font.render("Press ENTER to Continue", True, WHITE)
-            screen.blit(restart_text, (SCREEN_WIDTH//2 - restart_text.get_width()//2, SCREEN_HEIGHT*2//3))
+            restart_text = self.text_cache.render(self.font, "Press ENTER to Continue", WHITE)
+            self.mark_dirty(screen.blit(restart_text, (SCREEN_WIDTH//2 - restart_text.get_width()//2, SCREEN_HEIGHT*2//3)))
+        if self.profiler is not None:
+            self.profiler.mark("hud")
+
+    def draw(self, screen, alpha=1.0):
+        """Draw the current screen.
+
+        alpha (0..1) is how far the frame falls between the previous and the
+        latest simulation tick; moving things are drawn interpolated by it.
+        """
+        if self.font is None or not pygame.font.get_init():  # Fonts die with pygame.quit()
+            self.font = get_font(36)
+            self.big_font = get_font(72)
+
+        # The camera follows the player across roads wider than the screen
+        player = self.player
+        self.camera_x = int(self.road.camera_x(interpolate(player.prev_x, player.x, alpha)))
+
+        # Switching screens repaints everything
+        if self.renderer is not None and self.state != self.drawn_state:
+            self.renderer.invalidate()
+        self.drawn_state = self.state
 
-    def draw(self, screen):
         if self.state == MENU:
             self.draw_menu(screen)
         elif self.state == PLAYING:
-            self.draw_playing(screen)
+            self.draw_playing(screen, alpha)
         elif self.state == GAME_OVER:
             self.draw_game_over(screen)
 
-def main():
+def run_headless(inputs, game=None, max_frames=None):
+    """Step the race logic from an input stream without a display.
+
+    inputs is an iterable of key states (anything indexable by pygame key
+    constants, e.g. KeyState). The race starts immediately and runs until the
+    player crashes, the inputs run out or max_frames ticks have been simulated.
+    Returns the game and the number of frames simulated.
+    """
+    if game is None:
+        game = Game(headless=True)
+    game.reset()
+    game.state = PLAYING
+
+    frames = 0
+    for keys in inputs:
+        if max_frames is not None and frames >= max_frames:
+            break
+        frames += 1
+        if not game.update(keys):
+            break
+
+    return game, frames
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Racing Game")
+    parser.add_argument("--render", choices=["flip", "dirty"], default="flip",
+                        help="present full frames or only the changed rectangles")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible session")
+    parser.add_argument("--record", metavar="PATH", help="record the session's inputs for car_racing_replay.py")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="profile from the start and write the frame timings to PATH (.json or .csv) on exit")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each startup step took, up to the first frame")
+    parser.add_argument("--telemetry", metavar="PATH",
+                        help="record per-frame telemetry to PATH (load it with car_racing_telemetry.load_telemetry)")
+    parser.add_argument("--autopilot", type=float, nargs="?", const=3.0, metavar="MS",
+                        help="let the planner drive (attract mode), searching for at most MS per frame (default 3)")
+    parser.add_argument("--view", choices=["top-down", "pseudo-3d"], default="top-down",
+                        help="draw the race from above or from behind the car on a curving, hilly road")
+    parser.add_argument("--lanes", type=int, default=LANE_COUNT,
+                        help=f"lanes on the road (default {LANE_COUNT}); wide roads scroll to follow the car")
+    parser.add_argument("--traffic", choices=["off", "follow", "rush-hour"], default="off",
+                        help="enemy car behaviour: fixed speeds, car-following traffic, "
+                             "or car-following on a ring road packed with cars")
+    parser.add_argument("--ghosts", metavar="DIR",
+                        help="save each race to DIR and race against the best earlier ones saved there")
+    parser.add_argument("--sim-rate", type=int, default=FPS, help="simulation ticks per second")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help="frame rate cap for drawing, e.g. 144 for a 144 Hz display (0 for no cap)")
+    args = parser.parse_args(argv)
+    if args.lanes < 1:
+        parser.error("--lanes must be at least 1")
+    if args.seed is not None and not 0 <= args.seed < SEED_LIMIT:
+        parser.error("--seed must be between 0 and 2**63 - 1")
+
+    # Startup steps as (label, end time) for --startup-report
+    startup = [("imports", time.perf_counter())]
+
+    # Only the display is needed up front; fonts load on the first draw and
+    # the game has no audio, so the mixer is never initialised
+    pygame.display.init()
+
     # Set up the display
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Racing Game")
-    clock = pygame.time.Clock()
+    startup.append(("display", time.perf_counter()))
 
-    game = Game()
+    # Pre-render every sprite now that the display format is known
+    get_sprite_atlas()
+    get_player_rotations()
+    clock = pygame.time.Clock()
+    startup.append(("sprites", time.perf_counter()))
+
+    road = Road(args.lanes)
+    max_enemies = MAX_ENEMY_CARS
+    if args.traffic != "off":
+        import car_racing_traffic
+        max_enemies = max(max_enemies, car_racing_traffic.pool_size(road))
+    game = Game(seed=args.seed, sim_rate=args.sim_rate, road=road, max_enemies=max_enemies)
+    if args.traffic != "off":
+        if args.traffic == "rush-hour":
+            game.traffic = car_racing_traffic.rush_hour(game.seed, road=game.road)
+        else:
+            game.traffic = car_racing_traffic.TrafficModel(game.seed, road=game.road)
+    startup.append(("game", time.perf_counter()))
+    if args.view == "pseudo-3d":
+        from car_racing_pseudo3d import Pseudo3DView, get_projection
+        game.view = Pseudo3DView()
+        get_projection()
+    autopilot = None
+    if args.autopilot is not None:
+        from car_racing_autopilot import Autopilot
+        autopilot = Autopilot(budget_ms=args.autopilot)
+    ghost_recorder = None
+    if args.ghosts:
+        from car_racing_ghosts import GhostRecorder, GhostSet, ghost_path
+        os.makedirs(args.ghosts, exist_ok=True)
+        game.ghosts = GhostSet.load(args.ghosts, lanes=game.road.lanes)
+        ghost_recorder = GhostRecorder()
+    recording = None
+    if args.record:
+        from car_racing_replay import Recording
+        traffic = None if game.traffic is None else (game.traffic.ring_length or 0, game.traffic.cars)
+        recording = Recording(game.seed, sim_rate=game.sim_rate, lanes=game.road.lanes, traffic=traffic)
+    if args.render == "dirty":
+        game.renderer = DirtyRectRenderer()
+    telemetry = None
+    if args.telemetry:
+        from car_racing_telemetry import TelemetryRecorder
+        telemetry = TelemetryRecorder(args.telemetry, {"seed": game.seed, "sim_rate": game.sim_rate})
+
+    # F3 toggles profiling together with its overlay
+    profiler = FrameProfiler()
+    if args.profile:
+        game.profiler = profiler
+
+    # The simulation advances in fixed ticks of real time, however long
+    # frames take; drawing interpolates between the last two ticks
+    tick_length = 1 / game.sim_rate
+    accumulator = 0.0
+    last_time = time.perf_counter()
     running = True
 
     while running:
@@ -564,22 +1336,101 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-
-        # Get keyboard state
-        keys = pygame.key.get_pressed()
-
-        # Update game state
-        if not game.update(keys):
-            pass  # Game over is handled within the game class
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.visible = not profiler.visible
+                game.profiler = profiler if profiler.visible or args.profile else None
+                if game.renderer is not None:
+                    game.renderer.invalidate()
+
+        if game.profiler is not None:
+            profiler.begin_frame()
+
+        # Get keyboard state, or the autopilot's
+        keys = pygame.key.get_pressed() if autopilot is None else autopilot(game)
+        if game.profiler is not None:
+            profiler.mark("input")
+
+        # Run the simulation ticks that fit in the time since the last frame
+        now = time.perf_counter()
+        frame_time = now - last_time
+        accumulator += frame_time
+        last_time = now
+        steps = 0
+        while accumulator >= tick_length and steps < MAX_SIM_STEPS:
+            if recording is not None:
+                recording.record(keys)
+            was_playing = game.state == PLAYING
+            game.update(keys)  # Game over is handled within the game class
+            if ghost_recorder is not None:
+                if game.state == PLAYING:
+                    ghost_recorder.record(game)
+                elif was_playing:
+                    ghost_recorder.save(ghost_path(args.ghosts, game), game)
+            accumulator -= tick_length
+            steps += 1
+
+        # Drop time the simulation could not catch up on rather than spiral
+        if steps == MAX_SIM_STEPS:
+            accumulator = min(accumulator, tick_length)
 
         # Draw everything
-        game.draw(screen)
+        game.draw(screen, min(accumulator / tick_length, 1.0))
+        if autopilot is not None and game.state == PLAYING:
+            status = game.text_cache.render(game.font, f"Autopilot: {autopilot.nodes} nodes", WHITE)
+            game.mark_dirty(screen.blit(status, (SCREEN_WIDTH - status.get_width() - 20, SCREEN_HEIGHT - 50)))
+        if game.profiler is not None and profiler.visible:
+            game.mark_dirty(profiler.draw(screen))
+            profiler.mark("hud")
 
         # Update display
-        pygame.display.flip()
+        if game.renderer is not None:
+            game.renderer.present()
+        else:
+            pygame.display.flip()
+
+        if game.profiler is not None:
+            profiler.mark("present")
+            profiler.end_frame()
+
+        if telemetry is not None:
+            telemetry.record(game, frame_time * 1000)
+
+        if args.startup_report and len(startup) == 4:
+            startup.append(("first frame", time.perf_counter()))
+            steps = []
+            previous = IMPORT_STARTED
+            for label, end in startup:
+                steps.append(f"{label} {(end - previous) * 1000:.0f} ms")
+                previous = end
+            print(f"Startup: {', '.join(steps)}; total {(previous - IMPORT_STARTED) * 1000:.0f} ms")
 
         # Cap the frame rate
-        clock.tick(FPS)
+        clock.tick(args.fps)
+
+    if recording is not None:
+        recording.save(args.record)
+
+    if telemetry is not None:
+        telemetry.close()
+
+    if game.ghosts is not None:
+        game.ghosts.close()
+
+    # A race still running when the window closes is a ghost too
+    if ghost_recorder is not None and game.state == PLAYING and ghost_recorder.samples:
+        ghost_recorder.save(ghost_path(args.ghosts, game), game)
+
+    if args.profile:
+        profiler.export(args.profile)
+
+    if autopilot is not None and autopilot.frames:
+        print(f"Autopilot: {autopilot.total_nodes / autopilot.frames:.0f} nodes per frame on average, "
+              f"slowest frame {autopilot.max_elapsed_ms:.1f} ms")
+
+    if game.renderer is not None and game.renderer.frames:
+        average = game.renderer.total_pixels / game.renderer.frames
+        print(f"Dirty rects: {average:.0f} pixels pushed per frame on average "
+              f"({average / (SCREEN_WIDTH * SCREEN_HEIGHT):.0%} of the window)")
 
     pygame.quit()
     sys.exit()
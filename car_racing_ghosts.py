@@ -0,0 +1,209 @@
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+import pygame
+
+import car_racing_game as racing
+
+# Ghost file layout: header, then chunks of (chunk header, zlib-compressed
+# int16 deltas). Each chunk starts from an absolute sample, so it decodes
+# on its own and files can be streamed a chunk at a time.
+MAGIC = b"CRGH"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBIfQ")  # magic, version, ticks per sample, lanes, samples, distance, seed
+CHUNK = struct.Struct("<IHiii")  # compressed size, samples, first x, direction and travel
+CHUNK_SAMPLES = 256
+EXTENSION = ".crg"
+
+# Samples every SAMPLE_TICKS ticks of 1/FPS, quantised to these steps
+SAMPLE_TICKS = 4
+X_STEP = 1 / 8
+DIRECTION_STEP = 1 / 1024
+TRAVEL_STEP = 1 / 8
+STEPS = np.array([X_STEP, DIRECTION_STEP, TRAVEL_STEP])
+
+MAX_GHOSTS = 50
+GHOST_ALPHA = 100
+
+_ghost_sprites = None
+
+def get_ghost_sprites():
+    # Translucent copies of the player's rotated sprites, shared by every ghost
+    global _ghost_sprites
+    if _ghost_sprites is None:
+        _ghost_sprites = []
+        for image in racing.get_player_rotations().images:
+            ghost = image.copy()
+            ghost.fill((255, 255, 255, GHOST_ALPHA), special_flags=pygame.BLEND_RGBA_MULT)
+            _ghost_sprites.append(ghost)
+    return _ghost_sprites
+
+class GhostRecorder:
+    """Records the player's x, direction and travel during a race for a ghost file.
+
+    A sample is taken every SAMPLE_TICKS ticks and quantised. Each value
+    is stored as the difference from the previous one, which stays small
+    and repetitive at steady driving and compresses to a few KB a minute.
+    """
+
+    def __init__(self, sample_ticks=SAMPLE_TICKS):
+        self.sample_ticks = sample_ticks
+        self.samples = []
+        self.next_time = 0.0
+
+    def record(self, game):
+        # Call after every tick of a race; a new race starts a new recording
+        if self.samples and game.game_time < self.next_time - self.sample_ticks / racing.FPS:
+            self.samples = []
+            self.next_time = 0.0
+        if game.game_time + 1e-9 < self.next_time:
+            return
+        player = game.player
+        self.samples.append((round(player.x / X_STEP), round(player.direction / DIRECTION_STEP),
+                             round(game.distance * 10 / TRAVEL_STEP)))
+        self.next_time += self.sample_ticks / racing.FPS
+
+    def save(self, path, game):
+        """Write the race recorded so far to path."""
+        samples = np.array(self.samples, dtype=np.int64).reshape(-1, 3)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.sample_ticks, game.road.lanes, len(samples),
+                                game.distance, game.seed))
+            for start in range(0, len(samples), CHUNK_SAMPLES):
+                chunk = samples[start:start + CHUNK_SAMPLES]
+                deltas = np.clip(np.diff(chunk, axis=0), -32768, 32767).astype("<i2")
+                data = zlib.compress(deltas.tobytes(), 9)
+                f.write(CHUNK.pack(len(data), len(chunk), *chunk[0].tolist()))
+                f.write(data)
+        self.samples = []
+        self.next_time = 0.0
+
+def read_header(f):
+    magic, version, sample_ticks, lanes, samples, distance, seed = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{f.name} is not a ghost file")
+    return sample_ticks, lanes, samples, distance, seed
+
+class GhostStream:
+    """Plays a ghost file back, reading one chunk at a time as the race goes on.
+
+    state(t) interpolates the recording at race time t seconds. Times
+    must not go backwards except through restart().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.sample_ticks, self.lanes, self.samples, self.distance, self.seed = read_header(self.file)
+        self.interval = self.sample_ticks / racing.FPS
+        self.restart()
+
+    def restart(self):
+        self.file.seek(HEADER.size)
+        self.first = 0  # Index of the first sample in values
+        self.values = np.empty((0, 3))
+        self.read_chunk()
+
+    def read_chunk(self):
+        # Append the next chunk's samples, keeping the previous chunk's last one for interpolation
+        header = self.file.read(CHUNK.size)
+        if len(header) < CHUNK.size:
+            return False
+        size, count, *start = CHUNK.unpack(header)
+        deltas = np.frombuffer(zlib.decompress(self.file.read(size)), dtype="<i2").reshape(-1, 3)
+        chunk = np.cumsum(np.vstack([start, deltas]), axis=0) * STEPS
+        kept = self.values[-1:]
+        self.first += len(self.values) - len(kept)
+        self.values = np.vstack([kept, chunk])
+        return True
+
+    def state(self, t):
+        """(x, direction, travel) at race time t, or None once the recording has ended."""
+        position = t / self.interval
+        index = int(position)
+        while index + 1 >= self.first + len(self.values):
+            if not self.read_chunk():
+                return None
+        i = index - self.first
+        if i < 0:
+            return None
+        a = self.values[i]
+        b = self.values[i + 1]
+        t = position - index
+        return a + (b - a) * t
+
+    def close(self):
+        self.file.close()
+
+class GhostSet:
+    """Ghosts of earlier races shown alongside the player.
+
+    Ghosts are drawn in the player's lane of the road at their recorded x
+    and direction, ahead or behind by the difference in distance covered.
+    They take no part in the race. Set Game.ghosts to one of these.
+    """
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    @classmethod
+    def load(cls, directory, lanes=racing.LANE_COUNT, limit=MAX_GHOSTS):
+        """The limit furthest-reaching ghosts in directory that were recorded on a road of lanes."""
+        found = []
+        for name in os.listdir(directory) if os.path.isdir(directory) else ():
+            if not name.endswith(EXTENSION):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                try:
+                    _, ghost_lanes, _, distance, _ = read_header(f)
+                except (ValueError, struct.error):
+                    continue
+            if ghost_lanes == lanes:
+                found.append((distance, path))
+        found.sort(reverse=True)
+        return cls([GhostStream(path) for _, path in found[:limit]])
+
+    def restart(self):
+        for stream in self.streams:
+            stream.restart()
+
+    def draw(self, game, screen, alpha=1.0, camera_x=0):
+        """Draw every ghost on screen in one batch; returns the bounding rect or None."""
+        sprites = get_ghost_sprites()
+        player = game.player
+        rotations = racing.get_player_rotations()
+        lag = (1 - alpha) * game.step_scale
+        t = game.game_time - lag / racing.FPS
+        player_travel = game.distance * 10 - player.speed * lag
+        blits = []
+        for stream in self.streams:
+            state = stream.state(t)
+            if state is None:
+                continue
+            x, direction, travel = state.tolist()
+            y = player.y - (travel - player_travel)
+            if -player.height < y < racing.SCREEN_HEIGHT + player.height:
+                image = sprites[rotations.index(-direction * 180 / np.pi * 0.5)]
+                blits.append((image, image.get_rect(center=(x - camera_x, y))))
+        if not blits:
+            return None
+        rects = screen.blits(blits)
+        return rects[0].unionall(rects[1:])
+
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+
+def ghost_path(directory, game):
+    # One new file per race, named so they sort by when they were driven
+    stem = os.path.join(directory, f"ghost-{time.strftime('%Y%m%d-%H%M%S')}-{game.seed}")
+    path = stem + EXTENSION
+    count = 1
+    while os.path.exists(path):
+        path = f"{stem}-{count}{EXTENSION}"
+        count += 1
+    return path
@@ -0,0 +1,58 @@
+from bisect import bisect_left, bisect_right, insort
+from operator import attrgetter
+
+_entity_y = attrgetter("y")
+
+class LaneIndex:
+    """Spatial index that buckets entities by lane, each bucket ordered by y.
+
+    Entities need integer lane and numeric y attributes. Buckets are kept
+    sorted on insert; call resort() once per frame after entities move so
+    that range queries stay correct when entities overtake each other.
+    """
+
+    def __init__(self, lane_count):
+        self.lanes = [[] for _ in range(lane_count)]
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.lanes)
+
+    def add(self, entity):
+        insort(self.lanes[entity.lane], entity, key=_entity_y)
+
+    def remove(self, entity):
+        self.lanes[entity.lane].remove(entity)
+
+    def move(self, entity, lane):
+        # Change an entity's lane and keep the buckets consistent
+        self.remove(entity)
+        entity.lane = lane
+        self.add(entity)
+
+    def clear(self):
+        for bucket in self.lanes:
+            bucket.clear()
+
+    def resort(self):
+        # Buckets are nearly sorted after a frame, which timsort handles in linear time
+        for bucket in self.lanes:
+            bucket.sort(key=_entity_y)
+
+    def query(self, first_lane, last_lane, y_min, y_max):
+        """Return entities in lanes first_lane..last_lane with y_min <= y <= y_max."""
+        first_lane = max(first_lane, 0)
+        last_lane = min(last_lane, len(self.lanes) - 1)
+        found = []
+        for lane in range(first_lane, last_lane + 1):
+            bucket = self.lanes[lane]
+            if not bucket:
+                continue
+            low = bisect_left(bucket, y_min, key=_entity_y)
+            high = bisect_right(bucket, y_max, lo=low, key=_entity_y)
+            found.extend(bucket[low:high])
+        return found
+
+    def lane_occupied(self, lane, y_max):
+        # The first entity in a bucket has the smallest y
+        bucket = self.lanes[lane]
+        return bool(bucket) and bucket[0].y < y_max
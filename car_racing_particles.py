@@ -0,0 +1,146 @@
+import numpy as np
+import pygame
+
+# Largest particle radius that can be emitted
+MAX_PARTICLE_SIZE = 8
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+
+class ParticleSystem:
+    """Structure-of-arrays particle engine for the racing game.
+
+    Position, velocity, size, life and colour live in preallocated NumPy
+    arrays that grow by doubling when full. update() advances every live
+    particle in one vectorised step and compacts dead ones by moving live
+    particles from the end of the arrays into their slots (swap-remove).
+    draw() blits pre-rendered circle stamps for all particles in one batch.
+    """
+
+    def __init__(self, capacity=256, seed=None):
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+        self.capacity = 0
+        self.x = np.empty(0, dtype=np.float32)
+        self.y = np.empty(0, dtype=np.float32)
+        self.vx = np.empty(0, dtype=np.float32)
+        self.vy = np.empty(0, dtype=np.float32)
+        self.size = np.empty(0, dtype=np.float32)
+        self.life = np.empty(0, dtype=np.float32)
+        self.color = np.empty(0, dtype=np.int16)
+        self.grow(capacity)
+
+        # Colours are stored as indices into a palette; one stamp per colour and radius
+        self.palette = []
+        self.palette_index = {}
+        self.stamps = []
+
+    def __len__(self):
+        return self.count
+
+    def grow(self, capacity):
+        for name in ("x", "y", "vx", "vy", "size", "life", "color"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, x, y, color, count=10):
+        """Spawn count particles at (x, y) with random size, velocity and life."""
+        if count <= 0:
+            return
+        if self.count + count > self.capacity:
+            capacity = max(self.capacity, 1)
+            while capacity < self.count + count:
+                capacity *= 2
+            self.grow(capacity)
+
+        color = tuple(color)
+        if color not in self.palette_index:
+            self.palette_index[color] = len(self.palette)
+            self.palette.append(color)
+
+        start = self.count
+        end = start + count
+        rng = self.rng
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = rng.uniform(-2, 2, count)
+        self.vy[start:end] = rng.uniform(-2, 2, count)
+        self.size[start:end] = rng.integers(3, MAX_PARTICLE_SIZE + 1, count)
+        self.life[start:end] = rng.integers(20, 41, count)
+        self.color[start:end] = self.palette_index[color]
+        self.count = end
+
+    def update(self, scale=1.0):
+        # scale is the tick length in 1/60 s units
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.vx[:n] * scale
+        self.y[:n] += self.vy[:n] * scale
+        self.life[:n] -= scale
+        np.maximum(self.size[:n] - 0.1 * scale, 0, out=self.size[:n])
+
+        dead = np.flatnonzero(self.life[:n] <= 0)
+        if len(dead) == 0:
+            return
+
+        # Fill holes below the new count with the live particles above it
+        alive = n - len(dead)
+        holes = dead[dead < alive]
+        if len(holes):
+            movers = alive + np.flatnonzero(self.life[alive:n] > 0)
+            for array in (self.x, self.y, self.vx, self.vy, self.size, self.life, self.color):
+                array[holes] = array[movers]
+        self.count = alive
+
+    def stamp_table(self):
+        # Circle stamps indexed by color * (MAX_PARTICLE_SIZE + 1) + radius.
+        # Colorkeyed RLE surfaces blit much faster than per-pixel alpha ones.
+        converted = pygame.display.get_surface() is not None
+        for color in self.palette[len(self.stamps) // (MAX_PARTICLE_SIZE + 1):]:
+            colorkey = BLACK if color != BLACK else WHITE
+            for radius in range(MAX_PARTICLE_SIZE + 1):
+                stamp = pygame.Surface((radius * 2 + 1, radius * 2 + 1))
+                stamp.fill(colorkey)
+                if radius > 0:
+                    pygame.draw.circle(stamp, color, (radius, radius), radius)
+                if converted:
+                    stamp = stamp.convert()
+                stamp.set_colorkey(colorkey, pygame.RLEACCEL)
+                self.stamps.append(stamp)
+        return self.stamps
+
+    def draw(self, screen, offset_x=0):
+        """Draw every particle, shifted left by offset_x; returns the bounding rect of the batch or None."""
+        n = self.count
+        if n == 0:
+            return None
+        radius = self.size[:n].astype(np.int32)
+        x = (self.x[:n] - offset_x).astype(np.int32)
+        y = self.y[:n].astype(np.int32)
+
+        # Skip particles that have shrunk away or left the screen
+        width, height = screen.get_size()
+        visible = np.flatnonzero((radius > 0) & (x + radius >= 0) & (x - radius < width) &
+                                 (y + radius >= 0) & (y - radius < height))
+        if len(visible) == 0:
+            return None
+        radius = radius[visible]
+        left = x[visible] - radius
+        top = y[visible] - radius
+        keys = self.color[:n][visible].astype(np.int32) * (MAX_PARTICLE_SIZE + 1) + radius
+
+        stamps = self.stamp_table()
+        screen.blits(zip(map(stamps.__getitem__, keys.tolist()),
+                         zip(left.tolist(), top.tolist())), doreturn=False)
+
+        extent = radius * 2 + 1
+        x0 = int(left.min())
+        y0 = int(top.min())
+        return pygame.Rect(x0, y0, int((left + extent).max()) - x0, int((top + extent).max()) - y0)
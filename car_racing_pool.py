@@ -0,0 +1,57 @@
+class EntityPool:
+    """Fixed-size pool of reusable entity objects.
+
+    acquire() hands out a released object when one is free (a hit), or
+    allocates a new one while fewer than max_size exist (a miss). Once the
+    bound is reached and nothing is free, acquire() returns None and the
+    request is counted as rejected. New objects are built with
+    factory(*args); reused ones are re-initialised with spawn(*args).
+    """
+
+    def __init__(self, factory, max_size):
+        self.factory = factory
+        self.max_size = max_size
+        self.free = []
+        self.allocated = 0
+        self.in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.peak_in_use = 0
+
+    def acquire(self, *args):
+        if self.free:
+            entity = self.free.pop()
+            entity.spawn(*args)
+            self.hits += 1
+        elif self.allocated < self.max_size:
+            entity = self.factory(*args)
+            self.allocated += 1
+            self.misses += 1
+        else:
+            self.rejected += 1
+            return None
+
+        self.in_use += 1
+        if self.in_use > self.peak_in_use:
+            self.peak_in_use = self.in_use
+        return entity
+
+    def release(self, entity):
+        self.free.append(entity)
+        self.in_use -= 1
+
+    def release_all(self, entities):
+        self.free.extend(entities)
+        self.in_use -= len(entities)
+
+    def stats(self):
+        return {
+            "max_size": self.max_size,
+            "allocated": self.allocated,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+        }
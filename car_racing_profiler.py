@@ -0,0 +1,129 @@
+import csv
+import json
+import math
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+# Phases timed by Game.update and Game.draw, in frame order
+PHASES = ["input", "player", "particles", "power-ups", "obstacles", "enemies", "spawning",
+          "menu", "background", "road", "entities", "hud", "present"]
+PERCENTILES = (50, 95, 99)
+
+# Frames between refreshes of the overlay text
+OVERLAY_REFRESH = 30
+OVERLAY_COLUMN = 50
+
+class FrameProfiler:
+    """Per-phase frame timer backed by a fixed-size ring buffer.
+
+    Call begin_frame() at the start of a frame, mark(phase) at the end of
+    each phase (the time since the previous mark is added to that phase)
+    and end_frame() once the frame is presented. The last capacity frames
+    are kept as one row of milliseconds per frame; phases not reached in a
+    frame are stored as NaN. The game only calls into the profiler when
+    Game.profiler is set, so a disabled profiler costs nothing.
+    """
+
+    def __init__(self, phases=PHASES, capacity=600):
+        self.phases = list(phases)
+        self.columns = {phase: i for i, phase in enumerate(self.phases)}
+        self.samples = np.full((capacity, len(self.phases) + 1), np.nan)
+        self.frame_numbers = np.zeros(capacity, dtype=np.int64)
+        self.capacity = capacity
+        self.frames = 0
+        self.current = [math.nan] * len(self.phases)
+        self.frame_start = self.last = perf_counter()
+
+        self.visible = False
+        self.font = None
+        self.overlay = None
+
+    def begin_frame(self):
+        self.current = [math.nan] * len(self.phases)
+        self.frame_start = self.last = perf_counter()
+
+    def mark(self, phase):
+        now = perf_counter()
+        i = self.columns[phase]
+        elapsed = (now - self.last) * 1000
+        value = self.current[i]
+        self.current[i] = elapsed if value != value else value + elapsed
+        self.last = now
+
+    def end_frame(self):
+        row = self.frames % self.capacity
+        self.samples[row, :-1] = self.current
+        self.samples[row, -1] = (perf_counter() - self.frame_start) * 1000
+        self.frame_numbers[row] = self.frames
+        self.frames += 1
+
+    def recorded(self):
+        # Rows in chronological order
+        count = min(self.frames, self.capacity)
+        start = self.frames - count
+        order = np.arange(start, self.frames) % self.capacity
+        return self.frame_numbers[order], self.samples[order]
+
+    def stats(self):
+        """Return {phase: {"mean", "p50", "p95", "p99"}} in ms, plus "total"."""
+        _, samples = self.recorded()
+        result = {}
+        for i, phase in enumerate(self.phases + ["total"]):
+            values = samples[:, i]
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            entry = {"mean": float(values.mean())}
+            for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                entry[f"p{q}"] = float(value)
+            result[phase] = entry
+        return result
+
+    def export(self, path):
+        """Write the buffered frames to path as JSON (.json) or CSV (anything else)."""
+        frame_numbers, samples = self.recorded()
+        columns = self.phases + ["total"]
+        if path.endswith(".json"):
+            frames = []
+            for frame, row in zip(frame_numbers.tolist(), samples.tolist()):
+                entry = {"frame": frame}
+                entry.update((phase, value) for phase, value in zip(columns, row) if value == value)
+                frames.append(entry)
+            with open(path, "w") as f:
+                json.dump({"unit": "ms", "phases": columns, "stats": self.stats(), "frames": frames}, f, indent=1)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame"] + columns)
+                for frame, row in zip(frame_numbers.tolist(), samples.tolist()):
+                    writer.writerow([frame] + [f"{value:.4f}" if value == value else "" for value in row])
+
+    def render_overlay(self):
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self.font = pygame.font.Font(None, 20)
+        rows = [["phase ms"] + [f"p{q}" for q in PERCENTILES]]
+        for phase, entry in self.stats().items():
+            rows.append([phase] + [f"{entry[f'p{q}']:.2f}" for q in PERCENTILES])
+
+        # Phase names left-aligned, numbers right-aligned in fixed columns
+        line_height = self.font.get_linesize()
+        overlay = pygame.Surface((90 + OVERLAY_COLUMN * len(PERCENTILES) + 10, line_height * len(rows) + 10))
+        overlay.set_alpha(200)
+        for i, row in enumerate(rows):
+            y = 5 + i * line_height
+            overlay.blit(self.font.render(row[0], True, (255, 255, 255)), (5, y))
+            for j, cell in enumerate(row[1:]):
+                text = self.font.render(cell, True, (255, 255, 255))
+                overlay.blit(text, (90 + OVERLAY_COLUMN * (j + 1) - text.get_width(), y))
+        return overlay
+
+    def draw(self, screen):
+        """Draw the percentile table in the bottom-left corner; returns the dirty rect."""
+        # Rebuilding the text every frame would dominate the timings it shows
+        if self.overlay is None or self.frames % OVERLAY_REFRESH == 0:
+            self.overlay = self.render_overlay()
+        return screen.blit(self.overlay, (10, screen.get_height() - self.overlay.get_height() - 10))
@@ -0,0 +1,295 @@
+import math
+
+import numpy as np
+import pygame
+
+import car_racing_game as racing
+
+# Track, in world units: laterally one unit is one top-down pixel, along
+# the road one top-down pixel of travel is DEPTH_SCALE units
+SEGMENT_LENGTH = 200
+DRAW_SEGMENTS = 60
+DEPTH_SCALE = 4
+CAMERA_HEIGHT = 240
+FIELD_OF_VIEW = math.pi / 2
+STRIPE_LENGTH = 400  # Grass, rumble and marking colours alternate every STRIPE_LENGTH / 2
+
+# Sections of (segments, curve, hill). curve is the sideways bend added per
+# segment squared (positive bends right); hill is the change in height over
+# the section. The hills sum to zero so the loop joins up.
+TRACK = (
+    (40, 0, 0),
+    (60, 3, 0),
+    (30, 0, 1200),
+    (50, -4, 0),
+    (40, 2, -600),
+    (30, 0, 0),
+    (60, -2, -1400),
+    (40, 5, 800),
+    (50, 0, 0),
+)
+
+GRASS_COLORS = [(16, 200, 16), (0, 154, 0)]
+RUMBLE_COLORS = [racing.WHITE, (200, 0, 0)]
+ROAD_COLORS = [(60, 60, 60), racing.DARK_GRAY]
+SKY_COLOR = (135, 206, 235)
+RUMBLE_WIDTH = 0.08  # Of the road width
+
+# Sprites are scaled to sizes that step by this ratio and cached per step
+SPRITE_SIZE_STEP = 1.06
+
+def build_track(track=TRACK):
+    """Per-segment curve and elevation arrays of a track profile.
+
+    Curves ease in and out over the first and last quarter of their
+    section; hills follow a cosine between the section's start and end
+    heights.
+    """
+    curves = []
+    elevations = []
+    height = 0.0
+    for segments, curve, hill in track:
+        for i in range(segments):
+            t = i / segments
+            ease = min(1.0, 4 * t, 4 * (1 - t))
+            curves.append(curve * ease)
+            elevations.append(height + hill * (1 - math.cos(t * math.pi)) / 2)
+        height += hill
+    return np.array(curves), np.array(elevations)
+
+class Projection:
+    """Screen projection of a looping track, precomputed for every camera segment.
+
+    For the camera at the start of segment i, row_depth[i] and
+    row_offset[i] hold per scanline the distance to the road shown there
+    (0 for sky) and the road centre's sideways offset. points[i] holds each segment boundary ahead, as
+    (screen y, offset, clip): clip is the lowest scanline not yet covered
+    by nearer road when that segment is drawn, which hides sprites behind
+    hill crests. Rows are filled near to far so crests occlude what lies
+    behind them. Drawing a frame only interpolates between two tables.
+    """
+
+    def __init__(self, track=TRACK, width=racing.SCREEN_WIDTH, height=racing.SCREEN_HEIGHT):
+        self.width = width
+        self.height = height
+        self.horizon = height // 2
+        self.focal = width / 2 / math.tan(FIELD_OF_VIEW / 2)
+        self.curves, self.elevations = build_track(track)
+        self.segments = len(self.curves)
+        self.length = self.segments * SEGMENT_LENGTH
+
+        self.row_depth = np.zeros((self.segments, height), dtype=np.float32)
+        self.row_offset = np.zeros((self.segments, height), dtype=np.float32)
+        self.points = np.zeros((self.segments, DRAW_SEGMENTS + 1, 3), dtype=np.float32)
+        rows = np.arange(height)
+        ahead = np.arange(DRAW_SEGMENTS + 1)
+        depth = np.maximum(ahead * SEGMENT_LENGTH, 1.0)
+
+        for camera in range(self.segments):
+            # Sideways offsets: each segment bends the road by the curve so far
+            curve = self.curves[(camera + ahead) % self.segments]
+            offset = np.concatenate([[0.0], np.cumsum(np.cumsum(curve[:-1]))])
+            elevation = self.elevations[(camera + ahead) % self.segments]
+            y = self.horizon + (self.elevations[camera] + CAMERA_HEIGHT - elevation) * self.focal / depth
+
+            clip = height
+            for j in range(1, DRAW_SEGMENTS + 1):
+                self.points[camera, j - 1, 2] = clip
+                top = max(math.ceil(y[j]), 0)
+                if top < clip:
+                    # Interpolate 1/depth and offset/depth, which are linear on screen
+                    r = rows[top:clip]
+                    t = (y[j - 1] - r) / (y[j - 1] - y[j])
+                    near, far = 1 / depth[j - 1], 1 / depth[j]
+                    inverse = near + (far - near) * t
+                    self.row_depth[camera, top:clip] = 1 / inverse
+                    self.row_offset[camera, top:clip] = (offset[j - 1] * near + (offset[j] * far - offset[j - 1] * near) * t) / inverse
+                    clip = top
+            self.points[camera, DRAW_SEGMENTS, 2] = clip
+            self.points[camera, :, 0] = y
+            self.points[camera, :, 1] = offset
+
+    def elevation(self, position):
+        # Road height at a track position, interpolated between segment boundaries
+        segment, t = divmod(position / SEGMENT_LENGTH, 1)
+        segment = int(segment) % self.segments
+        start = self.elevations[segment]
+        return start + (self.elevations[(segment + 1) % self.segments] - start) * t
+
+_projections = {}
+
+def get_projection(track=TRACK, width=racing.SCREEN_WIDTH, height=racing.SCREEN_HEIGHT):
+    # Tables depend only on the track and resolution, so build each once
+    key = (track, width, height)
+    projection = _projections.get(key)
+    if projection is None:
+        projection = _projections[key] = Projection(track, width, height)
+    return projection
+
+class ScaledSprites:
+    """Sprites resized to a fixed ladder of sizes, built on first use."""
+
+    def __init__(self, step=SPRITE_SIZE_STEP):
+        self.log_step = math.log(step)
+        self.step = step
+        self.images = {}
+
+    def get(self, key, image, scale):
+        bucket = round(math.log(scale) / self.log_step)
+        scaled = self.images.get((key, bucket))
+        if scaled is None:
+            size = self.step ** bucket
+            scaled = pygame.transform.scale(image, (max(1, round(image.get_width() * size)),
+                                                    max(1, round(image.get_height() * size))))
+            self.images[key, bucket] = scaled
+        return scaled
+
+class Pseudo3DView:
+    """Draws a Game as a behind-the-car perspective view of a curving, climbing road.
+
+    The race itself is unchanged: entities keep their top-down positions,
+    which are mapped onto the track ahead, and curves and hills are only
+    scenery. Set Game.view to one of these to use it.
+    """
+
+    def __init__(self, track=TRACK):
+        self.track = track
+        self.projection = None
+        self.sprites = ScaledSprites()
+
+    def camera(self, game, alpha):
+        # Track position and sideways position of the camera, a focal length behind the player
+        player = game.player
+        travel = game.distance * 10 - player.speed * game.step_scale * (1 - alpha)
+        position = (travel * DEPTH_SCALE) % self.projection.length
+        lateral = racing.interpolate(player.prev_x, player.x, alpha) - racing.SCREEN_WIDTH // 2
+        return position, lateral
+
+    def draw_scenery(self, game, screen, alpha=1.0):
+        """Draw sky, grass and road; returns the dirty rect (the whole screen)."""
+        width, height = screen.get_size()
+        if self.projection is None or (self.projection.width, self.projection.height) != (width, height):
+            self.projection = get_projection(self.track, width, height)
+        projection = self.projection
+        position, lateral = self.camera(game, alpha)
+
+        # Blend the tables of the two camera segments around the camera
+        segment, t = divmod(position / SEGMENT_LENGTH, 1)
+        segment = int(segment)
+        following = (segment + 1) % projection.segments
+        depth = projection.row_depth[segment]
+        next_depth = projection.row_depth[following]
+        both = (depth > 0) & (next_depth > 0)
+        depth = np.where(both, depth + (next_depth - depth) * t, depth)
+        offset = projection.row_offset[segment]
+        offset = np.where(both, offset + (projection.row_offset[following] - offset) * t, offset)
+
+        road_rows = np.flatnonzero(depth > 0)
+        top = int(road_rows[0]) if len(road_rows) else height
+        depth = depth[top:]
+        scale = projection.focal / depth
+        center = width / 2 + (offset[top:] - lateral) * scale
+        half_width = game.road.width / 2 * scale
+        stripe = ((position + depth) // (STRIPE_LENGTH / 2) % 2).astype(np.int8)
+
+        # Sky and clouds above the road
+        screen.fill(SKY_COLOR, (0, 0, width, top))
+        clip = screen.get_clip()
+        screen.set_clip((0, 0, width, top))
+        layers = game.get_layers()
+        x = int(game.cloud_x)
+        for dx in (x - layers.sky.get_width(), x):
+            screen.blit(layers.sky, (dx, 0))
+        screen.set_clip(clip)
+
+        # Grass in bands of one colour, then the road one scanline at a time
+        changes = np.flatnonzero(np.diff(stripe)) + 1
+        starts = np.concatenate([[0], changes])
+        ends = np.concatenate([changes, [len(stripe)]])
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            screen.fill(GRASS_COLORS[stripe[start]], (0, top + start, width, end - start))
+
+        rumble = half_width * (1 + RUMBLE_WIDTH)
+        fill = screen.fill
+        rows = zip(range(top, height), stripe.tolist(), (center - rumble).tolist(), (2 * rumble).tolist(),
+                   (center - half_width).tolist(), (2 * half_width).tolist())
+        for y, light, rumble_left, rumble_width, road_left, road_width in rows:
+            fill(RUMBLE_COLORS[light], (rumble_left, y, rumble_width + 1, 1))
+            fill(ROAD_COLORS[light], (road_left, y, road_width + 1, 1))
+
+        # Lane markings on every other stripe, with the centre line in yellow
+        marked = np.flatnonzero(stripe)
+        if len(marked):
+            road = game.road
+            lines = [(divider - racing.SCREEN_WIDTH // 2, racing.WHITE) for divider in road.dividers]
+            lines.append((road.center - racing.SCREEN_WIDTH // 2, racing.YELLOW))
+            mark_width = np.maximum(racing.ROAD_MARK_WIDTH * scale[marked], 1)
+            marked_center = center[marked]
+            marked_scale = scale[marked]
+            for line, color in lines:
+                left = (marked_center + line * marked_scale - mark_width / 2).tolist()
+                for y, x, w in zip((marked + top).tolist(), left, mark_width.tolist()):
+                    fill(color, (x, y, w, 1))
+
+        return pygame.Rect(0, 0, width, height)
+
+    def place(self, game, position, lateral, x, y):
+        """Screen anchor, scale and clip row of a top-down (x, y) on the track, or None if unseen."""
+        projection = self.projection
+        distance = projection.focal + (game.player.y - y) * DEPTH_SCALE
+        ahead = distance / SEGMENT_LENGTH
+        if distance < SEGMENT_LENGTH or ahead >= DRAW_SEGMENTS:
+            return None
+        j, t = divmod(ahead, 1)
+        j = int(j)
+
+        # Blend the two camera segments' tables as draw_scenery does, so sprites stay on the road
+        segment, blend = divmod(position / SEGMENT_LENGTH, 1)
+        segment = int(segment) % projection.segments
+        here = projection.points[segment]
+        following = projection.points[(segment + 1) % projection.segments]
+        offset = here[j, 1] + (here[j + 1, 1] - here[j, 1]) * t
+        next_offset = following[j, 1] + (following[j + 1, 1] - following[j, 1]) * t
+        offset = float(offset + (next_offset - offset) * blend)
+        camera_height = projection.elevation(position) + CAMERA_HEIGHT
+        scale = projection.focal / distance
+        screen_y = projection.horizon + (camera_height - projection.elevation(position + distance)) * scale
+        clip_row = float(here[j, 2] + (following[j, 2] - here[j, 2]) * blend)
+        if screen_y - 1 > clip_row:
+            return None
+        screen_x = projection.width / 2 + (offset + x - racing.SCREEN_WIDTH // 2 - lateral) * scale
+        return screen_x, screen_y, scale, clip_row
+
+    def draw_sprites(self, game, screen, alpha=1.0):
+        """Draw obstacles, power-ups, enemy cars and the player; returns the dirty rect."""
+        position, lateral = self.camera(game, alpha)
+        atlas = racing.get_sprite_atlas()
+
+        # Far to near, so nearer sprites cover further ones
+        entities = []
+        for group in (game.obstacles, game.power_ups, game.enemy_cars):
+            for entity in group:
+                y = racing.interpolate(entity.prev_y, entity.y, alpha)
+                placed = self.place(game, position, lateral, entity.x, y)
+                if placed is not None:
+                    entities.append((placed, entity))
+        entities.sort(key=lambda item: item[0][1])
+
+        for (x, y, scale, clip_row), entity in entities:
+            image = self.sprites.get(entity.sprite_key, atlas[entity.sprite_key], scale)
+            w, h = image.get_size()
+            top = y - h
+            visible = min(h, clip_row - top)
+            if visible > 0:
+                screen.blit(image, (x - w / 2, top), (0, 0, w, visible))
+
+        # The player sits a focal length ahead of the camera, at full size
+        player = game.player
+        if not game.invincible or int(pygame.time.get_ticks() / 100) % 2 == 0:
+            projection = self.projection
+            camera_height = projection.elevation(position) + CAMERA_HEIGHT
+            base = projection.horizon + camera_height - projection.elevation(position + projection.focal)
+            index = player.rotation_index(racing.interpolate(player.prev_direction, player.direction, alpha))
+            image = player.rotations.images[index]
+            screen.blit(image, image.get_rect(midbottom=(projection.width // 2, base + player.height // 2)))
+        return pygame.Rect(0, 0, projection.width, projection.height)
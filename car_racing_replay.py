@@ -0,0 +1,175 @@
+import argparse
+import struct
+
+import pygame
+
+import car_racing_game as racing
+
+# Recording file layout: header, then (key mask, run length) pairs
+MAGIC = b"CRRP"
+VERSION = 4
+HEADER = struct.Struct("<4sBQIHBBII")  # magic, version, seed, frame count, ticks per second, lanes,
+                                       # traffic model on, ring length (0 for none), ring cars
+HEADER_V3 = struct.Struct("<4sBQIHB")  # version 3 recordings had no traffic model
+HEADER_V2 = struct.Struct("<4sBQIH")  # version 2 recordings used the default road
+HEADER_V1 = struct.Struct("<4sBQI")  # version 1 recordings also ran at racing.FPS
+RUN = struct.Struct("<BH")        # key mask, repeated frames
+MAX_RUN = 0xFFFF
+
+# Bit assigned to each recorded key
+KEY_BITS = [
+    (pygame.K_UP, 1),
+    (pygame.K_DOWN, 2),
+    (pygame.K_LEFT, 4),
+    (pygame.K_RIGHT, 8),
+    (pygame.K_RETURN, 16),
+]
+
+def encode_keys(keys):
+    mask = 0
+    for key, bit in KEY_BITS:
+        if keys[key]:
+            mask |= bit
+    return mask
+
+def decode_keys(mask):
+    return racing.KeyState(key for key, bit in KEY_BITS if mask & bit)
+
+# Decoding a mask is pure, so share one KeyState per possible mask
+_decoded = [decode_keys(mask) for mask in range(32)]
+
+class Recording:
+    """Seed, simulation rate, road, traffic and per-tick key states of one game session.
+
+    traffic is None when enemy cars kept fixed speeds, otherwise the
+    (ring_length, cars) of the car_racing_traffic.TrafficModel, with
+    ring_length 0 when the road is not a ring.
+
+    Frames are stored one key mask per byte in memory and run-length
+    encoded on disk, so an hour of steady driving takes a few KB.
+    """
+
+    def __init__(self, seed, frames=None, sim_rate=racing.FPS, lanes=racing.LANE_COUNT, traffic=None):
+        self.seed = seed
+        self.sim_rate = sim_rate
+        self.lanes = lanes
+        self.traffic = traffic
+        self.frames = bytearray() if frames is None else bytearray(frames)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def record(self, keys):
+        self.frames.append(encode_keys(keys))
+
+    def game(self, headless=False):
+        # A fresh game set up as the recorded one was
+        road = racing.Road(self.lanes)
+        if self.traffic is None:
+            return racing.Game(headless=headless, seed=self.seed, sim_rate=self.sim_rate, road=road)
+        from car_racing_traffic import TrafficModel, pool_size
+        game = racing.Game(headless=headless, seed=self.seed, sim_rate=self.sim_rate, road=road,
+                           max_enemies=max(racing.MAX_ENEMY_CARS, pool_size(road)))
+        ring_length, cars = self.traffic
+        game.traffic = TrafficModel(self.seed, ring_length or None, cars, road)
+        return game
+
+    def inputs(self):
+        # Key states to feed Game.update, one per recorded frame
+        return (_decoded[mask] for mask in self.frames)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            ring_length, cars = self.traffic or (0, 0)
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, len(self.frames), self.sim_rate, self.lanes,
+                                self.traffic is not None, ring_length, cars))
+            runs = bytearray()
+            i = 0
+            while i < len(self.frames):
+                mask = self.frames[i]
+                run = 1
+                while run < MAX_RUN and i + run < len(self.frames) and self.frames[i + run] == mask:
+                    run += 1
+                runs += RUN.pack(mask, run)
+                i += run
+            f.write(runs)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, frame_count = HEADER_V1.unpack_from(data)
+        if magic != MAGIC or version not in (1, 2, 3, VERSION):
+            raise ValueError(f"{path} is not a racing game recording")
+        header = [HEADER_V1, HEADER_V2, HEADER_V3, HEADER][version - 1]
+        fields = header.unpack_from(data)
+        sim_rate = racing.FPS if version == 1 else fields[4]
+        lanes = racing.LANE_COUNT if version < 3 else fields[5]
+        traffic = tuple(fields[7:9]) if version == VERSION and fields[6] else None
+        frames = bytearray()
+        for mask, run in RUN.iter_unpack(data[header.size:]):
+            frames += bytes((mask,)) * run
+        if len(frames) != frame_count:
+            raise ValueError(f"{path} is truncated: expected {frame_count} frames, found {len(frames)}")
+        return cls(seed, frames, sim_rate, lanes, traffic)
+
+def replay(recording, render=False, speed=1.0):
+    """Re-simulate a recording and return the resulting Game.
+
+    Without render the session runs headless as fast as possible. With
+    render it is drawn in a window at racing.FPS, advancing speed seconds
+    of recorded ticks per displayed second (fractions slow it down).
+    """
+    if not render:
+        game = recording.game(headless=True)
+        for keys in recording.inputs():
+            game.update(keys)
+        return game
+
+    pygame.display.init()
+    screen = pygame.display.set_mode((racing.SCREEN_WIDTH, racing.SCREEN_HEIGHT))
+    pygame.display.set_caption("Racing Game - Replay")
+    clock = pygame.time.Clock()
+    racing.get_sprite_atlas()
+    racing.get_player_rotations()
+
+    game = recording.game()
+    inputs = recording.inputs()
+    pending = 0.0
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        # Step as many simulation ticks as the replay speed calls for
+        pending += speed * recording.sim_rate / racing.FPS
+        while pending >= 1:
+            pending -= 1
+            keys = next(inputs, None)
+            if keys is None:
+                running = False
+                break
+            game.update(keys)
+
+        game.draw(screen)
+        pygame.display.flip()
+        clock.tick(racing.FPS)
+
+    pygame.quit()
+    return game
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded racing game session")
+    parser.add_argument("recording", help="file written by car_racing_game.py --record")
+    parser.add_argument("--render", action="store_true", help="draw the replay instead of running headless")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed, 1 for real time")
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.recording)
+    game = replay(recording, render=args.render, speed=args.speed)
+    print(f"Seed {recording.seed}: {len(recording)} frames, score {game.score}, "
+          f"distance {int(game.distance)} m, time {int(game.game_time)} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+
+import car_racing_game as racing
+
+# Reading channels, and the bit each entity kind sets in the lane grid
+ENEMY, OBSTACLE, POWER_UP, EDGE = range(4)
+KINDS = ["enemy", "obstacle", "power-up", "edge"]
+
+def entity_arrays(game):
+    """Centres, half sizes and kinds of every entity, grouped by kind.
+
+    Returns (x, y, half_width, half_height, kind, counts) where counts
+    holds the number of enemies, obstacles and power-ups in that order.
+    """
+    groups = [(game.enemy_cars, racing.EnemyCar), (game.obstacles, racing.Obstacle),
+              (game.power_ups, racing.PowerUp)]
+    counts = [len(entities) for entities, _ in groups]
+    total = sum(counts)
+    x = np.fromiter((entity.x for entities, _ in groups for entity in entities), dtype=float, count=total)
+    y = np.fromiter((entity.y for entities, _ in groups for entity in entities), dtype=float, count=total)
+    half_width = np.repeat([cls.width / 2 for _, cls in groups], counts)
+    half_height = np.repeat([cls.height / 2 for _, cls in groups], counts)
+    kind = np.repeat([ENEMY, OBSTACLE, POWER_UP], counts)
+    return x, y, half_width, half_height, kind, counts
+
+class LidarSensor:
+    """Fan of rays cast from the player car.
+
+    Ray i points offsets[i] radians from the car's heading (0 is straight
+    up the screen, positive is to the right). sense() returns, for every
+    ray, the distance in pixels to the nearest enemy, obstacle and
+    power-up bounding box and to the road edge, capped at max_range. All
+    rays are tested against all boxes in one NumPy slab test.
+    """
+
+    def __init__(self, rays=15, fov=math.pi, max_range=400.0):
+        self.offsets = np.linspace(-fov / 2, fov / 2, rays)
+        self.max_range = max_range
+
+    def sense(self, game):
+        """Return a (rays, 4) array of distances, columns ENEMY, OBSTACLE, POWER_UP, EDGE."""
+        player = game.player
+        angles = player.direction + self.offsets
+        dx = np.sin(angles)
+        dy = -np.cos(angles)
+
+        # Axis-parallel rays would divide by zero; a tiny component behaves the same
+        dx[np.abs(dx) < 1e-9] = 1e-9
+        dy[np.abs(dy) < 1e-9] = 1e-9
+        inv_dx = (1 / dx)[:, None]
+        inv_dy = (1 / dy)[:, None]
+
+        readings = np.full((len(self.offsets), len(KINDS)), self.max_range)
+        x, y, half_width, half_height, _, counts = entity_arrays(game)
+        if len(x):
+            # Slab test: each ray enters a box at the last of its x and y
+            # slab entries and leaves it at the first exit
+            tx1 = (x - half_width - player.x) * inv_dx
+            tx2 = (x + half_width - player.x) * inv_dx
+            ty1 = (y - half_height - player.y) * inv_dy
+            ty2 = (y + half_height - player.y) * inv_dy
+            enter = np.maximum(np.minimum(tx1, tx2), np.minimum(ty1, ty2))
+            leave = np.minimum(np.maximum(tx1, tx2), np.maximum(ty1, ty2))
+            enter = np.maximum(enter, 0)  # The car may already be inside a box
+            t = np.where(leave >= enter, enter, self.max_range)
+
+            # Nearest box of each kind; the groups are contiguous in t
+            kinds = [kind for kind, count in enumerate(counts) if count]
+            starts = np.cumsum([0] + counts[:-1])[kinds]
+            readings[:, kinds] = np.minimum(np.minimum.reduceat(t, starts, axis=1), self.max_range)
+
+        # The road edges are the vertical lines x = road.left and x = road.right
+        edge = np.where(dx < 0, game.road.left, game.road.right)
+        readings[:, EDGE] = np.minimum((edge - player.x) / dx, self.max_range)
+        return readings
+
+def lane_occupancy(game, ahead=400, behind=100, cell=50):
+    """Return a (lanes, rows) uint8 grid of what occupies the road around the player.
+
+    Rows are cell pixels tall and run from ahead pixels in front of the
+    player (row 0) to behind pixels behind it. Each cell holds a bitmask
+    with bit 1 << ENEMY, 1 << OBSTACLE or 1 << POWER_UP set for every kind
+    of entity whose bounding box overlaps it.
+    """
+    rows = (ahead + behind) // cell
+    road = game.road
+    grid = np.zeros((road.lanes, rows), dtype=np.uint8)
+    x, y, _, half_height, kind, _ = entity_arrays(game)
+    if not len(x):
+        return grid
+
+    top = game.player.y - ahead
+    first = np.floor((y - half_height - top) / cell).astype(np.int64)
+    last = np.floor((y + half_height - top) / cell).astype(np.int64)
+    visible = (last >= 0) & (first < rows)
+    if not visible.any():
+        return grid
+    first = np.maximum(first[visible], 0)
+    last = np.minimum(last[visible], rows - 1)
+    lane = np.clip((x[visible] - road.left) // road.lane_width, 0, road.lanes - 1).astype(np.int64)
+    bits = (1 << kind[visible]).astype(np.uint8)
+
+    # Expand every entity to the rows it spans and OR its bit into them
+    span = np.arange((last - first).max() + 1)
+    row = first[:, None] + span
+    covered = row <= last[:, None]
+    np.bitwise_or.at(grid, (np.broadcast_to(lane[:, None], row.shape)[covered], row[covered]),
+                     np.broadcast_to(bits[:, None], row.shape)[covered])
+    return grid
+
+def observe(game, sensor, ahead=400, behind=100, cell=50):
+    """Flat float32 observation: sensor readings scaled to 0..1 followed by the lane grid."""
+    readings = sensor.sense(game) / sensor.max_range
+    grid = lane_occupancy(game, ahead, behind, cell)
+    return np.concatenate([readings.ravel(), grid.ravel()]).astype(np.float32)
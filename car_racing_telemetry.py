@@ -0,0 +1,137 @@
+import json
+import math
+import queue
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+import car_racing_game as racing
+
+# One row per frame; stored on disk one .npy member per column and chunk
+FIELDS = [
+    ("frame", np.uint32),
+    ("race", np.uint16),
+    ("state", np.uint8),
+    ("player_x", np.float32),
+    ("speed", np.float32),
+    ("direction", np.float32),
+    ("enemies", np.uint16),
+    ("power_ups", np.uint16),
+    ("obstacles", np.uint16),
+    ("particles", np.uint32),
+    ("nearest_enemy", np.float32),  # NaN when no enemy is on the road
+    ("score", np.int32),
+    ("distance", np.float32),
+    ("frame_ms", np.float32),
+]
+ROW = np.dtype(FIELDS)
+
+CHUNK_FRAMES = 4096  # About 68 s of play at 60 FPS
+CHUNKS = 4
+
+class TelemetryRecorder:
+    """Per-frame game telemetry written to a zip of column chunks in the background.
+
+    Rows go into a ring of CHUNKS preallocated chunks. A full chunk is
+    handed to a writer thread, which appends each column to the file as
+    a compressed .npy member, while the game fills the next chunk. If the
+    writer falls behind and no chunk is free, frames are dropped (and
+    counted in dropped) rather than stalling the game loop.
+    """
+
+    def __init__(self, path, meta=None, chunk_frames=CHUNK_FRAMES, chunks=CHUNKS):
+        self.path = path
+        self.rows = np.zeros((chunks, chunk_frames), dtype=ROW)
+        self.chunk_frames = chunk_frames
+        self.frame = 0
+        self.race = 0
+        self.dropped = 0
+        self.written_chunks = 0
+        self.last_state = None
+
+        self.archive = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        meta = dict(meta or {}, fields=[name for name, _ in FIELDS], started=time.time())
+        self.archive.writestr("meta.json", json.dumps(meta))
+
+        self.free = queue.Queue()
+        for chunk in range(1, chunks):
+            self.free.put(chunk)
+        self.pending = queue.Queue()
+        self.chunk = 0
+        self.count = 0
+        self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+        self.writer.start()
+
+    def record(self, game, frame_ms):
+        """Append one row describing game after this frame."""
+        self.frame += 1
+        if game.state == racing.PLAYING and self.last_state != racing.PLAYING:
+            self.race += 1
+        self.last_state = game.state
+
+        if self.chunk is None:
+            try:
+                self.chunk = self.free.get_nowait()
+            except queue.Empty:
+                self.dropped += 1
+                return
+
+        player = game.player
+        nearest = math.nan
+        if game.enemy_cars:
+            nearest = min(math.hypot(car.x - player.x, car.y - player.y) for car in game.enemy_cars)
+        self.rows[self.chunk, self.count] = (
+            self.frame, self.race, game.state, player.x, player.speed, player.direction,
+            len(game.enemy_cars), len(game.power_ups), len(game.obstacles), len(game.particles),
+            nearest, game.score, game.distance, frame_ms)
+
+        self.count += 1
+        if self.count == self.chunk_frames:
+            self.pending.put((self.chunk, self.count))
+            self.chunk = None
+            self.count = 0
+
+    def write_chunks(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            chunk, count = item
+            rows = self.rows[chunk, :count]
+            for name, _ in FIELDS:
+                with self.archive.open(f"{self.written_chunks:06d}/{name}.npy", "w") as f:
+                    np.lib.format.write_array(f, np.ascontiguousarray(rows[name]))
+            self.written_chunks += 1
+            self.free.put(chunk)
+
+    def close(self):
+        # Flush the partly filled chunk, wait for the writer and finish the file
+        if self.chunk is not None and self.count:
+            self.pending.put((self.chunk, self.count))
+        self.pending.put(None)
+        self.writer.join()
+        self.archive.writestr("summary.json", json.dumps({"frames": self.frame, "dropped": self.dropped}))
+        self.archive.close()
+
+def load_telemetry(path):
+    """Load a telemetry file for analysis.
+
+    Returns (meta, columns), where columns maps each field name to one
+    array holding every recorded frame in order.
+    """
+    with zipfile.ZipFile(path) as archive:
+        meta = json.loads(archive.read("meta.json"))
+        if "summary.json" in archive.namelist():
+            meta.update(json.loads(archive.read("summary.json")))
+        parts = {name: [] for name, _ in FIELDS}
+        for member in sorted(archive.namelist()):
+            file_name = member.rpartition("/")[2]
+            if not file_name.endswith(".npy"):
+                continue
+            with archive.open(member) as f:
+                parts[file_name[:-4]].append(np.lib.format.read_array(f))
+    columns = {name: np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+               for (name, dtype), arrays in zip(FIELDS, parts.values())}
+    return meta, columns
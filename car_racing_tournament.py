@@ -0,0 +1,176 @@
+import argparse
+import csv
+import importlib
+import os
+import statistics
+from collections import Counter
+from multiprocessing import Pool
+
+import pygame
+
+import car_racing_game as racing
+
+# Races still running after this many frames end as "timeout" (one minute)
+MAX_FRAMES = racing.FPS * 60
+
+# Scripted driver settings
+CRUISE_SPEED = 3
+LOOKAHEAD = 300
+
+RESULT_FIELDS = ["policy", "seed", "score", "distance", "time", "frames", "cause"]
+
+def full_throttle(game):
+    """Floor it and never steer."""
+    return racing.KeyState({pygame.K_UP})
+
+def cruise_and_dodge(game):
+    """Hold a moderate speed and steer for the lane whose nearest threat is furthest ahead."""
+    player = game.player
+    pressed = set()
+    if player.speed < CRUISE_SPEED:
+        pressed.add(pygame.K_UP)
+    elif player.speed > CRUISE_SPEED + 1:
+        pressed.add(pygame.K_DOWN)
+
+    def clearance(lane):
+        y_min = player.y - LOOKAHEAD
+        y_max = player.y + player.height
+        threats = (game.enemy_index.query(lane, lane, y_min, y_max) +
+                   game.obstacle_index.query(lane, lane, y_min, y_max))
+        return min((player.y - entity.y for entity in threats), default=LOOKAHEAD)
+
+    # Prefer staying put, then the nearest lane, among equally clear lanes
+    road = game.road
+    current = road.lane_at(player.x)
+    target = max(range(road.lanes), key=lambda lane: (clearance(lane), -abs(lane - current)))
+    wanted_direction = max(-0.3, min(0.3, (road.lane_center(target) - player.x) / 200))
+    if player.direction < wanted_direction - 0.01:
+        pressed.add(pygame.K_RIGHT)
+    elif player.direction > wanted_direction + 0.01:
+        pressed.add(pygame.K_LEFT)
+    return racing.KeyState(pressed)
+
+def load_policy(name):
+    # "module:function", or the name of a policy defined in this module
+    module_name, _, function_name = name.rpartition(":")
+    return getattr(importlib.import_module(module_name or "car_racing_tournament"), function_name)
+
+def policy_name(policy):
+    return policy if isinstance(policy, str) else policy.__name__
+
+def run_race(task):
+    """Drive one headless race with a policy and return its result row.
+
+    task is (policy, seed, max_frames). The policy is called with the Game
+    every frame and returns a key state; it may also be given as a
+    "module:function" string so it can be resolved inside the worker.
+    """
+    policy, seed, max_frames = task
+    drive = load_policy(policy) if isinstance(policy, str) else policy
+    game = racing.Game(headless=True, seed=seed)
+
+    def inputs():
+        while True:
+            yield drive(game)
+
+    game, frames = racing.run_headless(inputs(), game, max_frames)
+    return {
+        "policy": policy_name(policy),
+        "seed": seed,
+        "score": game.score,
+        "distance": round(game.distance, 1),
+        "time": round(game.game_time, 2),
+        "frames": frames,
+        "cause": game.crash_cause or "timeout",
+    }
+
+def warm_up():
+    # Build the collision masks once per worker instead of during its first race
+    racing.get_sprite_atlas()
+    racing.get_player_rotations()
+
+def run_tournament(policies, seeds, max_frames=MAX_FRAMES, workers=None):
+    """Race every policy on every seed and yield results as they finish.
+
+    Races are spread over a process pool with one worker per core by
+    default, and arrive in completion order. Policies must be picklable,
+    i.e. module-level functions or "module:function" strings.
+    """
+    tasks = [(policy, seed, max_frames) for policy in policies for seed in seeds]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        warm_up()
+        for task in tasks:
+            yield run_race(task)
+        return
+
+    with Pool(workers, initializer=warm_up) as pool:
+        yield from pool.imap_unordered(run_race, tasks)
+
+def summarize(results):
+    """Aggregate result rows into per-policy statistics, keyed by policy name."""
+    by_policy = {}
+    for result in results:
+        by_policy.setdefault(result["policy"], []).append(result)
+
+    summary = {}
+    for name, rows in by_policy.items():
+        scores = [row["score"] for row in rows]
+        summary[name] = {
+            "races": len(rows),
+            "mean_score": statistics.fmean(scores),
+            "median_score": statistics.median(scores),
+            "best_score": max(scores),
+            "mean_distance": statistics.fmean(row["distance"] for row in rows),
+            "mean_time": statistics.fmean(row["time"] for row in rows),
+            "causes": Counter(row["cause"] for row in rows),
+        }
+    return summary
+
+def write_results(path, results):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(sorted(results, key=lambda row: (row["policy"], row["seed"])))
+
+def parse_seeds(values):
+    # Accept single seeds and inclusive ranges like 0-99
+    seeds = []
+    for value in values:
+        first, _, last = value.partition("-")
+        seeds.extend(range(int(first), int(last or first) + 1))
+    return seeds
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Race driver policies against each other on shared seeds")
+    parser.add_argument("policies", nargs="+", help="policies as module:function (or a built-in: full_throttle, cruise_and_dodge)")
+    parser.add_argument("--seeds", nargs="+", default=["0-31"], help="seeds or inclusive ranges such as 0-99")
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES, help="frames before a race ends as a timeout")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--out", metavar="PATH", help="write every race result to PATH as CSV")
+    args = parser.parse_args(argv)
+
+    for name in args.policies:
+        load_policy(name)  # Fail early on a bad name
+    seeds = parse_seeds(args.seeds)
+
+    results = []
+    total = len(args.policies) * len(seeds)
+    for result in run_tournament(args.policies, seeds, args.max_frames, args.workers):
+        results.append(result)
+        print(f"[{len(results)}/{total}] {result['policy']} seed {result['seed']}: score {result['score']}, "
+              f"{result['distance']:.0f} m, {result['time']:.1f} s, {result['cause']}")
+
+    if args.out:
+        write_results(args.out, results)
+
+    print()
+    print(f"{'policy':<24}{'races':>6}{'mean':>8}{'median':>8}{'best':>6}{'dist m':>9}{'time s':>8}  causes")
+    for name, stats in summarize(results).items():
+        causes = ", ".join(f"{cause} {count}" for cause, count in stats["causes"].most_common())
+        print(f"{name:<24}{stats['races']:>6}{stats['mean_score']:>8.1f}{stats['median_score']:>8.1f}"
+              f"{stats['best_score']:>6}{stats['mean_distance']:>9.0f}{stats['mean_time']:>8.1f}  {causes}")
+
+if __name__ == "__main__":
+    main()
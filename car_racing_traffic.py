@@ -0,0 +1,309 @@
+import random
+
+import numpy as np
+
+import car_racing_game as racing
+
+# Intelligent driver model parameters, in pixels and 1/FPS ticks
+MAX_ACCELERATION = 0.05
+COMFORT_BRAKING = 0.1
+MIN_GAP = 20
+HEADWAY = 20
+CAR_LENGTH = racing.EnemyCar.height
+
+# Lane changes: required acceleration gain, the braking a change may force
+# on the new follower, sideways speed and ticks before a car may change again
+CHANGE_THRESHOLD = 0.02
+SAFE_BRAKING = 0.2
+LANE_CHANGE_SPEED = 6
+CHANGE_COOLDOWN = racing.FPS * 2
+
+# Screen band in which cars exist as EnemyCar entities
+VISIBLE_TOP = -100
+VISIBLE_BOTTOM = racing.SCREEN_HEIGHT + 100
+
+# Rush hour ring road, filled to at most RUSH_HOUR_FILL of the cars it can hold
+RUSH_HOUR_CARS = 3000
+RUSH_HOUR_LENGTH = 200000
+RUSH_HOUR_FILL = 0.6
+
+# The ring starts with no cars from the top of the screen band down to a
+# few car lengths behind the player, like a race without the model
+START_Y = racing.SCREEN_HEIGHT - 150  # PlayerCar's starting y
+START_CLEAR_AHEAD = START_Y - VISIBLE_TOP
+START_CLEAR_BEHIND = CAR_LENGTH * 3
+
+# Offsets lanes by more than any position so one sorted key orders by (lane, position)
+LANE_KEY = 1e9
+
+def pool_size(road):
+    """Enemy entities the model can need at once on road: a lane's worth of the screen band per lane.
+
+    Pass it as Game(max_enemies=...) for games driven by a TrafficModel.
+    """
+    return road.lanes * (int((VISIBLE_BOTTOM - VISIBLE_TOP) // CAR_LENGTH) + 1)
+
+def ring_capacity(ring_length, road):
+    # Cars a ring holds bumper to bumper at the minimum gap, outside the player's start
+    clear = START_CLEAR_AHEAD + START_CLEAR_BEHIND
+    return int((ring_length - clear) * road.lanes // (CAR_LENGTH + MIN_GAP))
+
+def lane_at(road, x):
+    # Vectorised Road.lane_at
+    return np.clip((x - road.left) // road.lane_width, 0, road.lanes - 1).astype(np.int64)
+
+def idm_acceleration(velocity, desired, gap, closing):
+    """Intelligent driver model acceleration for followers with the given gaps."""
+    wanted_gap = MIN_GAP + np.maximum(velocity * HEADWAY + velocity * closing /
+                                      (2 * np.sqrt(MAX_ACCELERATION * COMFORT_BRAKING)), 0)
+    return MAX_ACCELERATION * (1 - (velocity / desired) ** 4 - (wanted_gap / np.maximum(gap, 0.1)) ** 2)
+
+class TrafficModel:
+    """Car-following and lane-changing traffic for every enemy car, stepped as arrays.
+
+    Each car is a row of lane, position, x, velocity, desired speed and
+    colour. Enemy cars travel down the screen, so position grows in their
+    direction of travel and the car ahead is the nearest one below. Each
+    tick every car gets an intelligent driver model acceleration from its
+    leader, found with one lexsort over (lane, position). Blocked cars
+    move to a neighbouring lane when the gaps there are safe and they
+    would accelerate harder. The candidate leaders and followers come
+    from searchsorted on the same sorted keys.
+
+    Only cars on or near the screen exist as EnemyCar entities (drawn and
+    collided with by Game); the rest live only in the arrays. With
+    ring_length set, the road is a closed loop of that length holding a
+    fixed population (rush hour). Otherwise Game.spawn_enemy adds cars
+    and cars leaving the screen are dropped, as without the model.
+    """
+
+    def __init__(self, seed=None, ring_length=None, cars=0, road=racing.DEFAULT_ROAD):
+        self.road = road
+        self.lane_centers = np.array([road.lane_center(lane) for lane in range(road.lanes)], dtype=float)
+        self.rng = random.Random(seed)
+        self.ring_length = ring_length
+        self.cars = cars
+        self.reset()
+
+    def reset(self):
+        self.travel = 0.0  # How far the player has scrolled the road
+        self.lane = np.zeros(0, dtype=np.int64)
+        self.position = np.zeros(0)
+        self.x = np.zeros(0)
+        self.velocity = np.zeros(0)
+        self.desired = np.zeros(0)
+        self.color = np.zeros(0, dtype=np.int64)
+        self.cooldown = np.zeros(0)
+        self.entities = np.full(0, None, dtype=object)
+        if self.ring_length:
+            self.populate_ring()
+
+    def add_cars(self, lane, position, desired, color):
+        lane = np.asarray(lane, dtype=np.int64)
+        self.lane = np.concatenate([self.lane, lane])
+        self.position = np.concatenate([self.position, position])
+        self.x = np.concatenate([self.x, self.lane_centers[lane]])
+        self.velocity = np.concatenate([self.velocity, desired])
+        self.desired = np.concatenate([self.desired, desired])
+        self.color = np.concatenate([self.color, np.asarray(color, dtype=np.int64)])
+        self.cooldown = np.concatenate([self.cooldown, np.zeros(len(lane))])
+        self.entities = np.concatenate([self.entities, np.full(len(lane), None, dtype=object)])
+
+    def populate_ring(self):
+        # Spread the cars evenly over the lanes and the loop outside the player's start
+        lanes = self.road.lanes
+        clear = START_CLEAR_AHEAD + START_CLEAR_BEHIND
+        if self.cars > ring_capacity(self.ring_length, self.road):
+            raise ValueError(f"a {self.ring_length} px ring of {lanes} lanes cannot hold {self.cars} cars")
+        lane = np.arange(self.cars) % lanes
+        spacing = (self.ring_length - clear) * lanes / max(self.cars, 1)
+        position = np.arange(self.cars) // lanes * spacing + lane * spacing / lanes
+        position = (position + START_Y + START_CLEAR_BEHIND) % self.ring_length
+        desired = [self.rng.uniform(2, 5) for _ in range(self.cars)]
+        color = [self.rng.randrange(len(racing.CAR_COLORS)) for _ in range(self.cars)]
+        self.add_cars(lane, position, desired, color)
+
+    def spawn(self, lane, rng):
+        """Add a car just above the screen; rush hour keeps a fixed population instead."""
+        if self.ring_length:
+            return
+        # Same draws as EnemyCar.spawn, so the game's random sequence is unchanged
+        desired = rng.uniform(2, 5)
+        color = racing.CAR_COLORS.index(rng.choice(racing.CAR_COLORS))
+        self.add_cars([lane], [VISIBLE_TOP + self.travel], [desired], [color])
+
+    def screen_y(self):
+        offset = self.position - self.travel
+        if self.ring_length:
+            # Wrap into the loop section centred on the screen
+            half = self.ring_length / 2
+            offset = (offset - racing.SCREEN_HEIGHT / 2 + half) % self.ring_length - half + racing.SCREEN_HEIGHT / 2
+        return offset
+
+    def sorted_keys(self):
+        """Sorted (lane, position) keys of every car and of cars still leaving a lane.
+
+        Returns (keys, cars), cars giving the row of the car behind each
+        key. A car moving between lanes also blocks the lane it is
+        leaving; on a ring every entry is repeated one loop behind and one
+        ahead so cars near the seam see their neighbours across it.
+        """
+        cars = np.arange(len(self.lane))
+        leaving = np.flatnonzero(lane_at(self.road, self.x) != self.lane)
+        lanes = np.concatenate([self.lane, lane_at(self.road, self.x[leaving])])
+        positions = np.concatenate([self.position, self.position[leaving]])
+        cars = np.concatenate([cars, leaving])
+        if self.ring_length:
+            lanes = np.tile(lanes, 3)
+            positions = np.concatenate([positions - self.ring_length, positions, positions + self.ring_length])
+            cars = np.tile(cars, 3)
+
+        order = np.lexsort((positions, lanes))
+        return lanes[order] * LANE_KEY + positions[order], cars[order]
+
+    def neighbours(self, keys, cars, lane, position):
+        """Nearest cars ahead of and behind (lane, position) in the sorted keys.
+
+        Returns (gap_ahead, car_ahead, gap_behind, car_behind). Missing
+        neighbours get an infinite gap and a car index of -1.
+        """
+        key = lane * LANE_KEY + position
+        ahead = np.searchsorted(keys, key, side="right")
+        behind = np.searchsorted(keys, key, side="left") - 1
+        ahead_key = keys[np.minimum(ahead, len(keys) - 1)]
+        behind_key = keys[np.maximum(behind, 0)]
+        has_ahead = (ahead < len(keys)) & (ahead_key < (lane + 0.5) * LANE_KEY)
+        has_behind = (behind >= 0) & (behind_key > (lane - 0.5) * LANE_KEY)
+
+        gap_ahead = np.where(has_ahead, ahead_key - key - CAR_LENGTH, np.inf)
+        car_ahead = np.where(has_ahead, cars[np.minimum(ahead, len(keys) - 1)], -1)
+        gap_behind = np.where(has_behind, key - behind_key - CAR_LENGTH, np.inf)
+        car_behind = np.where(has_behind, cars[np.maximum(behind, 0)], -1)
+        return gap_ahead, car_ahead, gap_behind, car_behind
+
+    def acceleration(self, velocity, desired, gap, leader):
+        # IDM acceleration behind the given leader rows (-1 for open road)
+        closing = np.where(leader >= 0, velocity - self.velocity[leader], 0.0)
+        return idm_acceleration(velocity, desired, gap, closing)
+
+    def step(self, scale=1.0):
+        """Advance every car by one tick of car-following and lane changes."""
+        if not len(self.lane):
+            return
+        keys, cars = self.sorted_keys()
+
+        # Car-following: the key after a car's own is its leader's
+        gap, leader, _, _ = self.neighbours(keys, cars, self.lane, self.position)
+        acceleration = self.acceleration(self.velocity, self.desired, gap, leader)
+
+        # Lane changes for settled cars that would do better next door
+        self.cooldown = np.maximum(self.cooldown - scale, 0)
+        ready = (self.cooldown == 0) & (self.x == self.lane_centers[self.lane])
+        best_gain = np.full(len(self.lane), CHANGE_THRESHOLD)
+        target = self.lane.copy()
+        for side in (-1, 1):
+            lane = self.lane + side
+            valid = ready & (lane >= 0) & (lane < self.road.lanes)
+            if not valid.any():
+                continue
+            gap_ahead, car_ahead, gap_behind, car_behind = self.neighbours(keys, cars, lane, self.position)
+            gain = self.acceleration(self.velocity, self.desired, gap_ahead, car_ahead) - acceleration
+
+            # The car that would end up behind must not have to brake hard
+            follower = np.maximum(car_behind, 0)
+            follower_acceleration = np.where(
+                car_behind >= 0,
+                idm_acceleration(self.velocity[follower], self.desired[follower], gap_behind,
+                                 self.velocity[follower] - self.velocity),
+                0.0)
+            accept = (valid & (gap_ahead > MIN_GAP) & (gap_behind > MIN_GAP) &
+                      (follower_acceleration > -SAFE_BRAKING) & (gain > best_gain))
+            best_gain = np.where(accept, gain, best_gain)
+            target = np.where(accept, lane, target)
+
+        # Of several cars merging into the same stretch of a lane, only the first goes
+        changing = np.flatnonzero(target != self.lane)
+        if len(changing):
+            order = changing[np.lexsort((self.position[changing], target[changing]))]
+            too_close = np.zeros(len(order), dtype=bool)
+            too_close[1:] = ((target[order][1:] == target[order][:-1]) &
+                             (np.diff(self.position[order]) < CAR_LENGTH + MIN_GAP))
+            target[order[too_close]] = self.lane[order[too_close]]
+            self.cooldown[target != self.lane] = CHANGE_COOLDOWN
+            self.lane = target
+
+        # Integrate speed, position and the sideways move towards the lane centre
+        self.velocity = np.maximum(self.velocity + acceleration * scale, 0)
+        self.position += self.velocity * scale
+        if self.ring_length:
+            self.position %= self.ring_length
+        step = LANE_CHANGE_SPEED * scale
+        self.x += np.clip(self.lane_centers[self.lane] - self.x, -step, step)
+
+    def remove(self, keep):
+        for name in ("lane", "position", "x", "velocity", "desired", "color", "cooldown", "entities"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def update(self, game, scale=1.0):
+        """Step the traffic and sync the enemy entities of game; returns points for passed cars.
+
+        Replaces the per-car EnemyCar.update loop in Game.update_playing.
+        """
+        self.travel += game.player.speed * scale
+        self.step(scale)
+        y = self.screen_y()
+
+        # Cars leaving the bottom were passed; without a ring they are dropped,
+        # as are cars left far behind above the screen
+        passed = y > VISIBLE_BOTTOM
+        points = 0
+        visible = (y >= VISIBLE_TOP) & ~passed
+        for i in np.flatnonzero(~visible & (self.entities != None)):
+            car = self.entities[i]
+            game.remove_entity(game.enemy_cars, game.enemy_pool, game.enemy_index, car)
+            self.entities[i] = None
+            if passed[i]:
+                points += 10
+        if not self.ring_length:
+            keep = ~passed & (y >= racing.DESPAWN_ABOVE)
+            if not keep.all():
+                self.remove(keep)
+                y = y[keep]
+                visible = visible[keep]
+
+        # Bring cars entering the band on screen as entities
+        for i in np.flatnonzero(visible & (self.entities == None)):
+            car = game.enemy_pool.acquire(self.rng, int(lane_at(self.road, self.x[i])), self.road)
+            if car is None:
+                # A car left out would still block lane changes while being invisible and harmless
+                raise RuntimeError(f"enemy pool of {game.enemy_pool.max_size} is too small for this traffic; "
+                                   f"create the Game with max_enemies=car_racing_traffic.pool_size(road)")
+            car.color = racing.CAR_COLORS[self.color[i]]
+            car.sprite_key = ("car", car.color)
+            car.image = None
+            car.x = self.x[i]
+            car.y = y[i]
+            self.entities[i] = car
+            game.enemy_cars.append(car)
+            game.enemy_index.add(car)
+
+        # Copy the simulated state onto the on-screen entities
+        for i in np.flatnonzero(self.entities != None):
+            car = self.entities[i]
+            car.prev_y = car.y
+            car.y = y[i]
+            car.x = self.x[i]
+            car.speed = self.velocity[i]
+            lane = int(lane_at(self.road, car.x))
+            if lane != car.lane:
+                game.enemy_index.move(car, lane)
+        return points
+
+def rush_hour(seed=None, cars=None, ring_length=RUSH_HOUR_LENGTH, road=racing.DEFAULT_ROAD):
+    """Traffic model for a ring road packed with cars.
+
+    cars defaults to RUSH_HOUR_CARS, or fewer on roads too narrow to fit them.
+    """
+    if cars is None:
+        cars = min(RUSH_HOUR_CARS, int(ring_capacity(ring_length, road) * RUSH_HOUR_FILL))
+    return TrafficModel(seed, ring_length, cars, road)
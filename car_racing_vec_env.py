@@ -0,0 +1,384 @@
+import math
+
+import numpy as np
+import pygame
+
+import car_racing_game as racing
+
+# Actions are throttle * 3 + steer
+COAST, ACCELERATE, BRAKE = 0, 1, 2
+STRAIGHT, LEFT, RIGHT = 0, 1, 2
+NUM_ACTIONS = 9
+
+# Reward shaping
+CRASH_PENALTY = 100.0
+
+# Constants shared with PlayerCar and the entity classes
+PLAYER_WIDTH = 50
+PLAYER_HEIGHT = 80
+PLAYER_Y = racing.SCREEN_HEIGHT - 150
+ACCELERATION = 0.2
+DECELERATION = 0.3
+FRICTION = 0.1
+STEERING_SPEED = 0.03
+BASE_MAX_SPEED = 10
+BOOST_MAX_SPEED = 15
+ROAD = racing.DEFAULT_ROAD  # Races always use the standard 3-lane road
+ENEMY_SIZE = (racing.EnemyCar.width, racing.EnemyCar.height)
+OBSTACLE_SIZE = (racing.Obstacle.width, racing.Obstacle.height)
+POWERUP_SIZE = (racing.PowerUp.width, racing.PowerUp.height)
+
+def action_from_keys(keys):
+    """Map a pygame key state to the matching action number."""
+    throttle = ACCELERATE if keys[pygame.K_UP] else BRAKE if keys[pygame.K_DOWN] else COAST
+    steer = LEFT if keys[pygame.K_LEFT] else RIGHT if keys[pygame.K_RIGHT] else STRAIGHT
+    return throttle * 3 + steer
+
+def mask_array(mask):
+    # Read a pygame mask back as a (height, width) boolean array
+    surface = mask.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 255))
+    return pygame.surfarray.array_red(surface).T > 0
+
+class CollisionTable:
+    """Precomputed mask overlaps between the rotated player and entity sprites.
+
+    For every rotation index and entity shape, the convolution of the two
+    masks marks each relative offset at which they overlap, so an exact
+    Game.player_collides test becomes a vectorised table lookup. Rows are
+    bit-packed along x to keep the tables small.
+    """
+
+    def __init__(self):
+        rotations = racing.get_player_rotations()
+        atlas = racing.get_sprite_atlas()
+        self.rotation_count = rotations.count
+        self.rotation_sizes = np.array([mask.get_size() for mask in rotations.masks], dtype=np.int64)
+        max_width, max_height = self.rotation_sizes.max(axis=0)
+
+        # Shape 0 is an enemy car (every colour has the same outline), then
+        # the oil spill and each rock variant
+        self.car = self.build(rotations.masks, [atlas.masks[("car", racing.CAR_COLORS[0])]],
+                              ENEMY_SIZE, max_width, max_height)
+        obstacle_masks = [atlas.masks[("oil",)]] + [atlas.masks[("rock", v)] for v in range(racing.ROCK_VARIANTS)]
+        self.obstacles = self.build(rotations.masks, obstacle_masks, OBSTACLE_SIZE, max_width, max_height)
+
+    def build(self, player_masks, entity_masks, size, max_width, max_height):
+        width = max_width + size[0] - 1
+        height = max_height + size[1] - 1
+        table = np.zeros((len(entity_masks), len(player_masks), height, width), dtype=bool)
+        for shape, entity_mask in enumerate(entity_masks):
+            for rotation, player_mask in enumerate(player_masks):
+                overlap = player_mask.convolve(entity_mask)
+                w, h = overlap.get_size()
+                table[shape, rotation, :h, :w] = mask_array(overlap)
+        return np.packbits(table, axis=-1)
+
+    def collides(self, table, shape, rotation, player_x, entity_x, entity_y, size):
+        """Exact collision test for arrays of player/entity pairs."""
+        width, height = size
+        rot_width = self.rotation_sizes[rotation, 0]
+        rot_height = self.rotation_sizes[rotation, 1]
+        # Same integer placement as pygame Rect(center=...) and the entity blit position
+        player_left = np.floor(player_x + 0.5).astype(np.int64) - rot_width // 2
+        player_top = int(PLAYER_Y) - rot_height // 2
+        left = np.trunc(entity_x - width // 2).astype(np.int64)
+        top = np.trunc(entity_y - height // 2).astype(np.int64)
+        i = left - player_left + width - 1
+        j = top - player_top + height - 1
+        valid = (i >= 0) & (j >= 0) & (j < table.shape[2]) & (i < table.shape[3] * 8)
+        i = np.where(valid, i, 0)
+        j = np.where(valid, j, 0)
+        packed = table[shape, rotation, j, i >> 3]
+        return valid & (((packed >> (7 - (i & 7))) & 1) == 1)
+
+_collision_table = None
+
+def get_collision_table():
+    global _collision_table
+    if _collision_table is None:
+        _collision_table = CollisionTable()
+    return _collision_table
+
+class VecRaceEnv:
+    """N races of the car racing game stepped in lockstep with NumPy.
+
+    The state of every race (player x, speed and direction, fixed slot
+    arrays for enemies, obstacles and power-ups, spawn and power-up timers,
+    distance and score) lives in arrays with one row per race, and step()
+    applies the rules of PlayerCar.update and Game.update_playing to all
+    rows at once, including exact mask collisions via CollisionTable.
+    Random events use one NumPy generator for the batch, so individual
+    races are not bit-identical to a seeded Game.
+
+    Actions are integers throttle * 3 + steer (see action_from_keys).
+    Rewards are the distance gained plus score gained, minus CRASH_PENALTY
+    on a crash. Finished races are reset automatically; the observation
+    returned for them is the first one of the new race and the final
+    stats are reported in info.
+    """
+
+    def __init__(self, num_envs, seed=None, max_enemies=racing.MAX_ENEMY_CARS,
+                 max_obstacles=racing.MAX_OBSTACLES, max_powerups=racing.MAX_POWER_UPS, max_steps=None):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        self.collisions = get_collision_table()
+
+        n = num_envs
+        self.x = np.zeros(n)
+        self.speed = np.zeros(n)
+        self.direction = np.zeros(n)
+        self.max_speed = np.zeros(n)
+        self.distance = np.zeros(n)
+        self.game_time = np.zeros(n)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.spawn_timer = np.zeros(n, dtype=np.int64)
+        self.powerup_spawn_timer = np.zeros(n, dtype=np.int64)
+        self.obstacle_spawn_timer = np.zeros(n, dtype=np.int64)
+        self.speed_boost = np.zeros(n, dtype=bool)
+        self.speed_boost_timer = np.zeros(n, dtype=np.int64)
+        self.invincible = np.zeros(n, dtype=bool)
+        self.invincible_timer = np.zeros(n, dtype=np.int64)
+
+        self.enemy_active = np.zeros((n, max_enemies), dtype=bool)
+        self.enemy_lane = np.zeros((n, max_enemies), dtype=np.int64)
+        self.enemy_x = np.zeros((n, max_enemies))
+        self.enemy_y = np.zeros((n, max_enemies))
+        self.enemy_speed = np.zeros((n, max_enemies))
+
+        # Obstacle shape 0 is an oil spill, 1 + v is rock variant v
+        self.obstacle_active = np.zeros((n, max_obstacles), dtype=bool)
+        self.obstacle_x = np.zeros((n, max_obstacles))
+        self.obstacle_y = np.zeros((n, max_obstacles))
+        self.obstacle_shape = np.zeros((n, max_obstacles), dtype=np.int64)
+
+        # Power-up type 0 is speed, 1 is invincible
+        self.powerup_active = np.zeros((n, max_powerups), dtype=bool)
+        self.powerup_x = np.zeros((n, max_powerups))
+        self.powerup_y = np.zeros((n, max_powerups))
+        self.powerup_type = np.zeros((n, max_powerups), dtype=np.int64)
+
+        self.observation_size = 5 + 4 * max_enemies + 3 * max_obstacles + 4 * max_powerups
+        self.lane_centers = np.array([ROAD.lane_center(lane) for lane in range(ROAD.lanes)], dtype=float)
+
+        # Start every race now, so step() before reset() sees valid cars rather than 0 / 0 speeds
+        self.reset()
+
+    def reset(self, mask=None):
+        """Start new races in the rows selected by mask (all rows by default)."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.x[mask] = racing.SCREEN_WIDTH // 2
+        self.speed[mask] = 0
+        self.direction[mask] = 0
+        self.max_speed[mask] = BASE_MAX_SPEED
+        for array in (self.distance, self.game_time, self.score, self.steps, self.spawn_timer,
+                      self.powerup_spawn_timer, self.obstacle_spawn_timer, self.speed_boost_timer,
+                      self.invincible_timer):
+            array[mask] = 0
+        for array in (self.speed_boost, self.invincible, self.enemy_active,
+                      self.obstacle_active, self.powerup_active):
+            array[mask] = False
+        return self.observe()
+
+    def update_player(self, actions):
+        # Vectorised PlayerCar.update
+        throttle = actions // 3
+        steer = actions % 3
+        speed = self.speed
+        coasting = np.where(speed > 0, np.maximum(speed - FRICTION, 0),
+                            np.where(speed < 0, np.minimum(speed + FRICTION, 0), speed))
+        speed = np.where(throttle == ACCELERATE, np.minimum(speed + ACCELERATION, self.max_speed),
+                         np.where(throttle == BRAKE, np.maximum(speed - DECELERATION, -self.max_speed / 2),
+                                  coasting))
+        steering = np.where(steer == LEFT, -STEERING_SPEED, np.where(steer == RIGHT, STEERING_SPEED, 0.0))
+        self.direction += steering * (np.abs(speed) / self.max_speed)
+        x = self.x + np.sin(self.direction) * speed
+        self.x = np.maximum(ROAD.left + PLAYER_WIDTH // 2, np.minimum(x, ROAD.right - PLAYER_WIDTH // 2))
+        self.speed = speed
+
+    def rotation_index(self):
+        # Same quantisation as PlayerCar.rotation_index
+        angle = -self.direction * 180 / math.pi * 0.5
+        return np.round(angle / racing.ROTATION_STEP).astype(np.int64) % self.collisions.rotation_count
+
+    def free_slot(self, active, rows):
+        # First inactive slot in each selected row, or -1 when the row is full
+        slot = np.argmin(active[rows], axis=1)
+        return np.where(active[rows, slot], -1, slot)
+
+    def random_lanes(self, rows, available=None):
+        scores = self.rng.random((len(rows), ROAD.lanes))
+        if available is not None:
+            scores = np.where(available, scores, -1.0)
+        return np.argmax(scores, axis=1)
+
+    def spawn_enemies(self, rows):
+        # A lane is free when no car in it is above y = 200
+        near_top = self.enemy_active[rows] & (self.enemy_y[rows] < 200)
+        lanes = np.arange(ROAD.lanes)
+        occupied = (near_top[:, :, None] & (self.enemy_lane[rows][:, :, None] == lanes)).any(axis=1)
+        available = ~occupied
+        rows = rows[available.any(axis=1)]
+        available = available[available.any(axis=1)]
+        lane = self.random_lanes(rows, available)
+        slot = self.free_slot(self.enemy_active, rows)
+        ok = slot >= 0
+        rows, lane, slot = rows[ok], lane[ok], slot[ok]
+        self.enemy_active[rows, slot] = True
+        self.enemy_lane[rows, slot] = lane
+        self.enemy_x[rows, slot] = self.lane_centers[lane]
+        self.enemy_y[rows, slot] = -100
+        self.enemy_speed[rows, slot] = self.rng.uniform(2, 5, len(rows))
+
+    def spawn_powerups(self, rows):
+        rows = rows[self.rng.random(len(rows)) < 0.3]  # 30% chance to spawn a power-up
+        slot = self.free_slot(self.powerup_active, rows)
+        ok = slot >= 0
+        rows, slot = rows[ok], slot[ok]
+        self.powerup_active[rows, slot] = True
+        self.powerup_x[rows, slot] = self.lane_centers[self.random_lanes(rows)]
+        self.powerup_y[rows, slot] = -100
+        self.powerup_type[rows, slot] = self.rng.integers(0, 2, len(rows))
+
+    def spawn_obstacles(self, rows):
+        rows = rows[self.rng.random(len(rows)) < 0.4]  # 40% chance to spawn an obstacle
+        slot = self.free_slot(self.obstacle_active, rows)
+        ok = slot >= 0
+        rows, slot = rows[ok], slot[ok]
+        self.obstacle_active[rows, slot] = True
+        self.obstacle_x[rows, slot] = self.lane_centers[self.random_lanes(rows)]
+        self.obstacle_y[rows, slot] = -100
+        rock = self.rng.random(len(rows)) < 0.5
+        self.obstacle_shape[rows, slot] = np.where(rock, 1 + self.rng.integers(0, racing.ROCK_VARIANTS, len(rows)), 0)
+
+    def step(self, actions):
+        """Advance every race by one frame.
+
+        Returns (observations, rewards, dones, info) where info holds the
+        final score, distance and time of the races that just ended.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        old_distance = self.distance.copy()
+        old_score = self.score.copy()
+        self.steps += 1
+
+        self.update_player(actions)
+        rotation = self.rotation_index()
+        self.distance += self.speed / 10
+        self.game_time += 1 / racing.FPS
+        speed = self.speed[:, None]
+        player_x = self.x[:, None]
+
+        # Power-ups: move, despawn, then collect
+        active = self.powerup_active
+        self.powerup_y += racing.PowerUp.speed - speed
+        active &= (self.powerup_y <= racing.SCREEN_HEIGHT + 100) & (self.powerup_y >= racing.DESPAWN_ABOVE)
+        collected = active & (np.abs(self.powerup_x - player_x) < (POWERUP_SIZE[0] + PLAYER_WIDTH) // 2) \
+            & (np.abs(self.powerup_y - PLAYER_Y) < (POWERUP_SIZE[1] + PLAYER_HEIGHT) // 2)
+        active &= ~collected
+        boost = (collected & (self.powerup_type == 0)).any(axis=1)
+        self.speed_boost |= boost
+        self.speed_boost_timer[boost] = racing.FPS * 5
+        self.max_speed[boost] = BOOST_MAX_SPEED
+        shield = (collected & (self.powerup_type == 1)).any(axis=1)
+        self.invincible |= shield
+        self.invincible_timer[shield] = racing.FPS * 5
+
+        # Obstacles: move, despawn, then crash or smash through when invincible
+        active = self.obstacle_active
+        self.obstacle_y += racing.Obstacle.speed - speed
+        active &= (self.obstacle_y <= racing.SCREEN_HEIGHT + 100) & (self.obstacle_y >= racing.DESPAWN_ABOVE)
+        rows = np.broadcast_to(rotation[:, None], active.shape)
+        hit = active & self.collisions.collides(self.collisions.obstacles, self.obstacle_shape, rows,
+                                                player_x, self.obstacle_x, self.obstacle_y, OBSTACLE_SIZE)
+        crashed = hit.any(axis=1) & ~self.invincible
+        active &= ~(hit & self.invincible[:, None])
+
+        # Enemy cars: move, score passed cars, despawn, then crash check.
+        # A race that already hit an obstacle stops updating, like Game.update_playing.
+        running = ~crashed
+        active = self.enemy_active
+        self.enemy_y += np.where(running[:, None], self.enemy_speed - speed, 0)
+        passed = active & (self.enemy_y > racing.SCREEN_HEIGHT + 100)
+        self.score += 10 * passed.sum(axis=1)
+        active &= ~passed & (self.enemy_y >= racing.DESPAWN_ABOVE)
+        rows = np.broadcast_to(rotation[:, None], active.shape)
+        hit = active & self.collisions.collides(self.collisions.car, np.zeros_like(self.enemy_lane), rows,
+                                                player_x, self.enemy_x, self.enemy_y, ENEMY_SIZE)
+        crashed |= running & hit.any(axis=1) & ~self.invincible
+        running = ~crashed
+
+        # Power-up timers
+        self.speed_boost_timer -= self.speed_boost & running
+        expired = self.speed_boost & running & (self.speed_boost_timer <= 0)
+        self.speed_boost &= ~expired
+        self.max_speed[expired] = BASE_MAX_SPEED
+        self.invincible_timer -= self.invincible & running
+        self.invincible &= ~(running & (self.invincible_timer <= 0))
+
+        # Spawning
+        self.spawn_timer += running
+        spawn_interval = np.maximum(racing.FPS * 1.5, racing.FPS * 3 - self.game_time / 10)
+        due = running & (self.spawn_timer >= spawn_interval)
+        self.spawn_enemies(np.flatnonzero(due))
+        self.spawn_timer[due] = 0
+
+        self.powerup_spawn_timer += running
+        due = running & (self.powerup_spawn_timer >= racing.FPS * 10)
+        self.spawn_powerups(np.flatnonzero(due))
+        self.powerup_spawn_timer[due] = 0
+
+        self.obstacle_spawn_timer += running
+        due = running & (self.obstacle_spawn_timer >= racing.FPS * 5)
+        self.spawn_obstacles(np.flatnonzero(due))
+        self.obstacle_spawn_timer[due] = 0
+
+        rewards = (self.distance - old_distance) + (self.score - old_score) - CRASH_PENALTY * crashed
+        dones = crashed.copy()
+        if self.max_steps is not None:
+            dones |= self.steps >= self.max_steps
+        info = {
+            "crashed": crashed,
+            "final_score": self.score[dones].copy(),
+            "final_distance": self.distance[dones].copy(),
+            "final_time": self.game_time[dones].copy(),
+        }
+        if dones.any():
+            self.reset(dones)
+        return self.observe(), rewards.astype(np.float32), dones, info
+
+    def observe(self):
+        """Observation matrix with one row per race.
+
+        Columns: player x offset from the road centre, speed, direction,
+        speed boost and invincibility flags, then per enemy slot (active,
+        dx, dy, relative speed), per obstacle slot (active, dx, dy) and per
+        power-up slot (active, dx, dy, type). Distances are scaled by the
+        road width and screen height; inactive slots are all zeros.
+        """
+        obs = np.zeros((self.num_envs, self.observation_size), dtype=np.float32)
+        obs[:, 0] = (self.x - racing.SCREEN_WIDTH // 2) / (racing.ROAD_WIDTH / 2)
+        obs[:, 1] = self.speed / BOOST_MAX_SPEED
+        obs[:, 2] = self.direction
+        obs[:, 3] = self.speed_boost
+        obs[:, 4] = self.invincible
+        column = 5
+        player_x = self.x[:, None]
+
+        def add(active, *features):
+            nonlocal column
+            width = len(features) + 1
+            block = np.stack((active,) + features, axis=-1) * active[..., None]
+            obs[:, column:column + width * active.shape[1]] = block.reshape(self.num_envs, -1)
+            column += width * active.shape[1]
+
+        add(self.enemy_active, (self.enemy_x - player_x) / racing.ROAD_WIDTH,
+            (self.enemy_y - PLAYER_Y) / racing.SCREEN_HEIGHT,
+            (self.enemy_speed - self.speed[:, None]) / BOOST_MAX_SPEED)
+        add(self.obstacle_active, (self.obstacle_x - player_x) / racing.ROAD_WIDTH,
+            (self.obstacle_y - PLAYER_Y) / racing.SCREEN_HEIGHT)
+        add(self.powerup_active, (self.powerup_x - player_x) / racing.ROAD_WIDTH,
+            (self.powerup_y - PLAYER_Y) / racing.SCREEN_HEIGHT, self.powerup_type)
+        return obs
@@ -1,15 +1,18 @@
 import tkinter as tk
 from tkinter import messagebox
-import random
+
+from tic_tac_toe_engine import DIFFICULTIES, Board, Engine
+
+# (size, k in a row) choices offered in the Board menu
+BOARD_SIZES = [(3, 3), (15, 5)]
 
 class TicTacToe:
-    def __init__(self, root):
+    def __init__(self, root, size=3, k=3):
         self.root = root
         self.root.title("Tic Tac Toe")
         self.root.resizable(False, False)
         
         self.current_player = "X"
-        self.board = [""] * 9
         self.game_over = False
         
         # Create menu
@@ -22,6 +25,12 @@ class TicTacToe:
         self.game_menu.add_separator()
         self.game_menu.add_command(label="Exit", command=root.quit)
         
+        self.board_menu = tk.Menu(self.menu, tearoff=0)
+        self.menu.add_cascade(label="Board", menu=self.board_menu)
+        for board_size, board_k in BOARD_SIZES:
+            self.board_menu.add_command(label=f"{board_size}x{board_size}, {board_k} in a row",
+                                        command=lambda s=board_size, n=board_k: self.set_board(s, n))
+        
         # Create game mode selection
         self.mode_frame = tk.Frame(root)
         self.mode_frame.pack(pady=10)
@@ -36,6 +45,10 @@ class TicTacToe:
         self.pvp_radio.grid(row=0, column=1, padx=5)
         self.pvc_radio.grid(row=0, column=2, padx=5)
         
+        self.difficulty_var = tk.StringVar(value="hard")
+        self.difficulty_menu = tk.OptionMenu(self.mode_frame, self.difficulty_var, *DIFFICULTIES)
+        self.difficulty_menu.grid(row=0, column=3, padx=5)
+        
         # Status label
         self.status_label = tk.Label(root, text="Player X's turn", font=("Arial", 12))
         self.status_label.pack(pady=5)
@@ -45,31 +58,45 @@ class TicTacToe:
         self.board_frame.pack()
         
         self.buttons = []
-        for i in range(3):
-            for j in range(3):
-                button = tk.Button(self.board_frame, text="", font=("Arial", 24, "bold"), 
-                                  width=5, height=2, 
+        self.set_board(size, k)
+    
+    def set_board(self, size, k):
+        # Positions are bitboards of each player's cells, checked against the engine's line masks
+        self.board = Board(size, k)
+        
+        # Solve every position of a small board up front so the computer answers instantly
+        self.engine = Engine(self.board)
+        self.engine.warm_up()
+        
+        for button in self.buttons:
+            button.destroy()
+        self.buttons = []
+        large = size > 3
+        for i in range(size):
+            for j in range(size):
+                button = tk.Button(self.board_frame, text="", font=("Arial", 12 if large else 24, "bold"), 
+                                  width=2 if large else 5, height=1 if large else 2, 
                                   command=lambda row=i, col=j: self.make_move(row, col))
-                button.grid(row=i, column=j, padx=2, pady=2)
+                button.grid(row=i, column=j, padx=0 if large else 2, pady=0 if large else 2)
                 self.buttons.append(button)
+        self.reset_game()
+    
+    def place(self, index, player):
+        self.masks[player] |= 1 << index
+        self.moves += 1
+        self.buttons[index].config(text=player, fg="blue" if player == "X" else "red")
     
     def make_move(self, row, col):
-        index = row * 3 + col
+        index = row * self.board.size + col
         
-        if self.board[index] == "" and not self.game_over:
-            self.board[index] = self.current_player
-            self.buttons[index].config(text=self.current_player)
-            
-            if self.current_player == "X":
-                self.buttons[index].config(fg="blue")
-            else:
-                self.buttons[index].config(fg="red")
+        if not (self.masks["X"] | self.masks["O"]) >> index & 1 and not self.game_over:
+            self.place(index, self.current_player)
             
-            if self.check_winner():
+            if self.check_winner(index):
                 self.status_label.config(text=f"Player {self.current_player} wins!")
                 self.game_over = True
                 messagebox.showinfo("Game Over", f"Player {self.current_player} wins!")
-            elif "" not in self.board:
+            elif self.moves == self.board.cells:
                 self.status_label.config(text="It's a tie!")
                 self.game_over = True
                 messagebox.showinfo("Game Over", "It's a tie!")
@@ -82,44 +109,16 @@ class TicTacToe:
                     self.root.after(500, self.computer_move)
     
     def computer_move(self):
-        # Simple AI: first try to win, then block player, then random move
-        
-        # Check for winning move
-        for i in range(9):
-            if self.board[i] == "":
-                self.board[i] = "O"
-                if self.check_winner(False):
-                    self.buttons[i].config(text="O", fg="red")
-                    self.status_label.config(text="Computer wins!")
-                    self.game_over = True
-                    messagebox.showinfo("Game Over", "Computer wins!")
-                    return
-                self.board[i] = ""
-        
-        # Check for blocking move
-        for i in range(9):
-            if self.board[i] == "":
-                self.board[i] = "X"
-                if self.check_winner(False):
-                    self.board[i] = "O"
-                    self.buttons[i].config(text="O", fg="red")
-                    self.current_player = "X"
-                    self.status_label.config(text="Player X's turn")
-                    return
-                self.board[i] = ""
-        
-        # Random move
-        empty_cells = [i for i, val in enumerate(self.board) if val == ""]
-        if empty_cells:
-            index = random.choice(empty_cells)
-            self.board[index] = "O"
-            self.buttons[index].config(text="O", fg="red")
+        # Best move from the engine at the selected difficulty
+        index = self.engine.best_move(self.masks["O"], self.masks["X"], self.difficulty_var.get())
+        if index is not None:
+            self.place(index, "O")
             
-            if self.check_winner():
+            if self.check_winner(index):
                 self.status_label.config(text="Computer wins!")
                 self.game_over = True
                 messagebox.showinfo("Game Over", "Computer wins!")
-            elif "" not in self.board:
+            elif self.moves == self.board.cells:
                 self.status_label.config(text="It's a tie!")
                 self.game_over = True
                 messagebox.showinfo("Game Over", "It's a tie!")
@@ -127,32 +126,13 @@ class TicTacToe:
                 self.current_player = "X"
                 self.status_label.config(text="Player X's turn")
     
-    def check_winner(self, update=True):
-        # Check rows
-        for i in range(0, 9, 3):
-            if self.board[i] == self.board[i+1] == self.board[i+2] != "":
-                if update:
-                    self.highlight_winning_line([i, i+1, i+2])
-                return True
-        
-        # Check columns
-        for i in range(3):
-            if self.board[i] == self.board[i+3] == self.board[i+6] != "":
-                if update:
-                    self.highlight_winning_line([i, i+3, i+6])
-                return True
-        
-        # Check diagonals
-        if self.board[0] == self.board[4] == self.board[8] != "":
-            if update:
-                self.highlight_winning_line([0, 4, 8])
-            return True
-        if self.board[2] == self.board[4] == self.board[6] != "":
-            if update:
-                self.highlight_winning_line([2, 4, 6])
-            return True
-        
-        return False
+    def check_winner(self, index):
+        # Only lines through the cell just played can have been completed
+        mask = self.masks["X"] if self.masks["X"] >> index & 1 else self.masks["O"]
+        if not self.board.wins(mask, index):
+            return False
+        self.highlight_winning_line(self.board.winning_line(mask, index))
+        return True
     
     def highlight_winning_line(self, indices):
         for i in indices:
@@ -160,7 +140,8 @@ class TicTacToe:
     
     def reset_game(self):
         self.current_player = "X"
-        self.board = [""] * 9
+        self.masks = {"X": 0, "O": 0}
+        self.moves = 0
         self.game_over = False
         self.status_label.config(text="Player X's turn")
         
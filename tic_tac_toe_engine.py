@@ -0,0 +1,266 @@
+import random
+
+# Scores are from the point of view of the player to move: WIN minus the
+# plies to the win, minus that for a loss, 0 for a draw or unknown
+WIN = 100
+INFINITY = WIN + 1
+
+# Transposition table bounds
+EXACT, LOWER, UPPER = range(3)
+
+# name: (search depth in plies, chance of a random move)
+DIFFICULTIES = {
+    "easy": (1, 0.3),
+    "medium": (2, 0.0),
+    "hard": (None, 0.0),
+}
+
+# Boards with more cells than this are played by the heuristic, not solved
+SOLVE_LIMIT = 9
+
+# Symmetry tables map masks a chunk of this many bits at a time
+CHUNK_BITS = 8
+
+class Board:
+    """Geometry of a size x size board won by k in a row.
+
+    Cells are numbered row by row, and a position is a pair of integer
+    bitboards: the cells held by the player to move and by their opponent.
+    Every run of k cells along a row, column or diagonal is precomputed as
+    a line mask, together with the lines through each cell, so checking a
+    move for a win only tests the lines it could have completed.
+    """
+
+    def __init__(self, size=3, k=3):
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        self.lines = []
+        for row in range(size):
+            for col in range(size):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row, end_col = row + d_row * (k - 1), col + d_col * (k - 1)
+                    if 0 <= end_row < size and 0 <= end_col < size:
+                        self.lines.append([(row + d_row * i) * size + col + d_col * i for i in range(k)])
+        self.line_masks = [sum(1 << cell for cell in line) for line in self.lines]
+        self.lines_through = [[] for _ in range(self.cells)]
+        for line, mask in zip(self.lines, self.line_masks):
+            for cell in line:
+                self.lines_through[cell].append(mask)
+
+        self.symmetry_tables = None
+
+    def wins(self, mask, cell):
+        """Whether the stones in mask complete a line through cell."""
+        return any(mask & line == line for line in self.lines_through[cell])
+
+    def is_win(self, mask):
+        return any(mask & line == line for line in self.line_masks)
+
+    def winning_line(self, mask, cell=None):
+        """Cells of a line completed in mask, through cell if given, or None."""
+        for line, line_mask in zip(self.lines, self.line_masks):
+            if mask & line_mask == line_mask and (cell is None or cell in line):
+                return line
+        return None
+
+    def symmetries(self):
+        # Each of the 8 rotations and reflections as a map from cell to cell
+        size = self.size
+        maps = []
+        for flip in (False, True):
+            for turns in range(4):
+                cells = []
+                for cell in range(self.cells):
+                    row, col = divmod(cell, size)
+                    if flip:
+                        col = size - 1 - col
+                    for _ in range(turns):
+                        row, col = col, size - 1 - row
+                    cells.append(row * size + col)
+                maps.append(cells)
+        return maps
+
+    def canonical(self, mine, theirs):
+        """Key shared by a position and all of its rotations and reflections."""
+        if self.symmetry_tables is None:
+            # Per symmetry, every value of every chunk of a mask, already moved into place
+            self.symmetry_tables = [
+                [[sum(1 << cells[start + bit] for bit in range(CHUNK_BITS)
+                      if value >> bit & 1 and start + bit < self.cells)
+                  for value in range(1 << CHUNK_BITS)]
+                 for start in range(0, self.cells, CHUNK_BITS)]
+                for cells in self.symmetries()]
+        chunk = (1 << CHUNK_BITS) - 1
+        best = None
+        for tables in self.symmetry_tables:
+            a = b = 0
+            for i, table in enumerate(tables):
+                shift = i * CHUNK_BITS
+                a |= table[mine >> shift & chunk]
+                b |= table[theirs >> shift & chunk]
+            key = a << self.cells | b
+            if best is None or key < best:
+                best = key
+        return best
+
+def _unshrink(score):
+    # Inverse of moving a score one step towards 0, for passing windows down a ply
+    return score + (score > 0) - (score < 0)
+
+class Engine:
+    """Computer player for a Board.
+
+    Small boards are solved by negamax with alpha-beta pruning. Results go
+    in a transposition table keyed on the depth searched and the canonical
+    form of the position under the board's 8 symmetries, so a solved
+    position answers every equivalent one. Scores are WIN minus the plies to a forced win,
+    negated for a forced loss, and 0 for a draw; a depth-limited search
+    scores positions it cannot see the end of as 0.
+
+    Boards over SOLVE_LIMIT cells are played by heuristic(), which weighs
+    every line each empty cell could still help either player complete.
+    """
+
+    def __init__(self, board=None, rng=None):
+        self.board = board or Board()
+        self.rng = rng or random.Random()
+        self.table = {}
+        self.move_scores = {}
+        self.nodes = 0
+
+    def negamax(self, mine, theirs, depth, alpha=-INFINITY, beta=INFINITY, last=None):
+        # last is the cell the opponent just played, the only place they can have won
+        self.nodes += 1
+        board = self.board
+        if last is not None and board.wins(theirs, last):
+            return -WIN
+        empty = ~(mine | theirs) & board.full
+        if not empty or depth == 0:
+            return 0
+        depth = min(depth, empty.bit_count())  # Searching to the end is exact at any depth
+
+        # Keyed on depth too: a deeper result would make a depth-limited search see too far
+        key = (board.canonical(mine, theirs), depth)
+        entry = self.table.get(key)
+        if entry is not None:
+            bound, score = entry
+            if bound == EXACT:
+                return score
+            if bound == LOWER and score >= beta:
+                return score
+            if bound == UPPER and score <= alpha:
+                return score
+
+        # Children's scores are one ply further from the end than this node's
+        raw_alpha, raw_beta = _unshrink(alpha), _unshrink(beta)
+        best = -INFINITY
+        window = raw_alpha
+        while empty:
+            move = empty & -empty
+            empty ^= move
+            score = -self.negamax(theirs, mine | move, depth - 1, -raw_beta, -window, move.bit_length() - 1)
+            if score > best:
+                best = score
+                if score > window:
+                    window = score
+                    if window >= raw_beta:
+                        break
+        best -= (best > 0) - (best < 0)
+
+        if best <= alpha:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table[key] = (bound, best)
+        return best
+
+    def scores(self, mine, theirs, depth=None):
+        """Score of every legal move for the player to move, as {cell: score}."""
+        board = self.board
+        if depth is None:
+            depth = board.cells
+        key = (mine, theirs, depth)
+        scores = self.move_scores.get(key)
+        if scores is None:
+            scores = {}
+            if not board.is_win(mine) and not board.is_win(theirs):
+                for cell in range(board.cells):
+                    move = 1 << cell
+                    if not (mine | theirs) & move:
+                        score = -self.negamax(theirs, mine | move, depth - 1, last=cell)
+                        scores[cell] = score - (score > 0) + (score < 0)
+            self.move_scores[key] = scores
+        return scores
+
+    def heuristic(self, mine, theirs):
+        """Cell scores for the player to move on boards too big to solve, as {cell: score}.
+
+        Every line still open to one player adds to its empty cells, more
+        steeply the more of it that player holds. A cell that wins, or
+        failing that blocks a win, is the only one offered.
+        """
+        board = self.board
+        occupied = mine | theirs
+        scores = {}
+        for line, mask in zip(board.lines, board.line_masks):
+            held = mine & mask
+            blocked = theirs & mask
+            if held and blocked:
+                continue
+            if held:
+                value = 8 ** held.bit_count() * 2
+            elif blocked:
+                value = 8 ** blocked.bit_count()
+            else:
+                continue
+            for cell in line:
+                if not occupied >> cell & 1:
+                    scores[cell] = scores.get(cell, 0) + value
+
+        # Winning outright comes first, then stopping the opponent winning
+        for player in (mine, theirs):
+            finishing = [cell for cell in scores if board.wins(player | 1 << cell, cell)]
+            if finishing:
+                return {cell: scores[cell] for cell in finishing}
+        if not scores:
+            # Nothing on the board yet, or no line left open: any empty cell will do
+            centre = board.cells // 2
+            empty = [cell for cell in range(board.cells) if not occupied >> cell & 1]
+            empty.sort(key=lambda cell: abs(cell // board.size - centre // board.size) +
+                       abs(cell % board.size - centre % board.size))
+            scores = {cell: 0 for cell in empty[:1]}
+        return scores
+
+    def best_move(self, mine, theirs, difficulty="hard"):
+        """A cell to play, chosen at random among the best at difficulty; None if there is none."""
+        depth, noise = DIFFICULTIES[difficulty]
+        if self.board.cells > SOLVE_LIMIT:
+            scores = self.heuristic(mine, theirs)
+        else:
+            scores = self.scores(mine, theirs, depth)
+        if not scores:
+            return None
+        if self.rng.random() < noise:
+            return self.rng.choice(list(scores))
+        best = max(scores.values())
+        return self.rng.choice([cell for cell, score in scores.items() if score == best])
+
+    def warm_up(self):
+        """Solve every reachable position of a small board, so later answers are table lookups."""
+        if self.board.cells > SOLVE_LIMIT:
+            return 0
+        seen = set()
+        stack = [(0, 0)]
+        while stack:
+            mine, theirs = stack.pop()
+            if (mine, theirs) in seen:
+                continue
+            seen.add((mine, theirs))
+            for cell in self.scores(mine, theirs):
+                stack.append((theirs, mine | 1 << cell))
+        return len(seen)